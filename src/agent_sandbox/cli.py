@@ -1,66 +1,187 @@
 """CLI for agent-sandbox."""
 
+import hashlib
+import json
 import os
+import shutil
 import subprocess
 import sys
+import threading
+import time
 from collections import deque
+from functools import lru_cache
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 import click
-from rich.console import Console, Group
-from rich.live import Live
-from rich.panel import Panel
-from rich.spinner import Spinner
-from rich.table import Table
-from rich.text import Text
-
-from .config import get_default_shell
-from .init import create_devcontainer, find_git_root
-from .manager import SandboxManager
+
 from .utils import find_project_root, generate_sandbox_name
 
+# Heavier modules (rich, manager, init, config and its TOML
+# parser) are imported inside the commands that use them so --help and
+# shell completion start quickly.
+if TYPE_CHECKING:
+    from rich.console import Console, RenderableType
+    from rich.text import Text
+
+    from .manager import SandboxManager
+
+
+@lru_cache(maxsize=None)
+def _console() -> "Console":
+    """Return the shared rich Console, importing rich on first use."""
+    from rich.console import Console
+
+    return Console()
 
-console = Console()
 
 # Number of build log lines to display
 BUILD_LOG_LINES = 10
 
+# Shells with completion support
+SUPPORTED_SHELLS = ("bash", "zsh", "fish")
 
-def complete_sandbox_names(ctx, param, incomplete):
-    """Complete sandbox names from running containers and filesystem."""
+
+# Seconds to reuse cached sandbox names between completion requests
+COMPLETION_CACHE_TTL = 2.0
+
+# Seconds to remember that the Docker daemon was unreachable
+DOCKER_DOWN_TTL = 5.0
+
+
+def _cache_dir() -> Path:
+    """Get the agent-sandbox cache directory."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(cache_home) / "agent-sandbox"
+
+
+def _completion_cache_path(cwd: Path, all_namespaces: bool) -> Path:
+    """Get the cache file for completion results of a directory."""
+    key = hashlib.md5(f"{cwd}:{all_namespaces}".encode()).hexdigest()[:16]
+    return _cache_dir() / f"complete-{key}.json"
+
+
+def _docker_reachable() -> bool:
+    """Check the Docker daemon, remembering failures for DOCKER_DOWN_TTL.
+
+    Keeps completion fast when the daemon is down instead of waiting on
+    docker for every keystroke.
+    """
+    from .docker import docker_daemon_reachable
+
+    marker = _cache_dir() / "docker-down"
     try:
-        # Check if -a/--all flag is set
-        all_namespaces = ctx.params.get("all", False)
+        if time.time() - marker.stat().st_mtime < DOCKER_DOWN_TTL:
+            return False
+    except OSError:
+        pass
+
+    if docker_daemon_reachable():
+        return True
 
-        # Get sandbox names from running containers
+    try:
+        marker.parent.mkdir(parents=True, exist_ok=True)
+        marker.touch()
+    except OSError:
+        pass
+    return False
+
+
+def _list_sandbox_names(all_namespaces: bool) -> list[str]:
+    """List sandbox names from running containers and filesystem."""
+    # Names are collected into one insertion-ordered dict: running sandboxes
+    # first (in order from ps), then filesystem sandboxes, deduplicated as
+    # they are added
+    names: dict[str, None] = {}
+
+    # Get sandbox names from running containers (skipped if Docker is down)
+    if _docker_reachable():
         manager = get_manager()
-        running_sandboxes = []
         try:
-            sandboxes = manager.list(all_namespaces=all_namespaces)
-            running_sandboxes = [sandbox.name for sandbox in sandboxes]
+            for sandbox in manager.list(all_namespaces=all_namespaces):
+                names[sandbox.name] = None
         except (ValueError, RuntimeError):
             # If manager initialization fails, continue with filesystem only
             pass
 
-        # Get sandbox names from filesystem (.sandboxes directory)
-        # Only include filesystem sandboxes when showing current project only
-        filesystem_sandboxes = []
-        if not all_namespaces:
+    # Get sandbox names from filesystem (.sandboxes directory)
+    # Only include filesystem sandboxes when showing current project only
+    if not all_namespaces:
+        try:
+            project_root = find_project_root()
+            if project_root:
+                sandboxes_dir = project_root / ".sandboxes"
+                # scandir reuses d_type from readdir instead of a stat per entry
+                with os.scandir(sandboxes_dir) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            names.setdefault(entry.name)
+        except Exception:
+            # If we can't find project root, continue with running sandboxes only
+            pass
+
+    return list(names)
+
+
+def _write_completion_cache(cache_path: Path, names: list[str]) -> None:
+    """Write completion results, skipping if another process holds the lock."""
+    try:
+        # Imported here since only this needs it, and it is POSIX-only
+        import fcntl
+    except ImportError:
+        return
+
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(cache_path, "a") as f:
             try:
-                project_root = find_project_root()
-                if project_root:
-                    sandboxes_dir = project_root / ".sandboxes"
-                    if sandboxes_dir.exists():
-                        filesystem_sandboxes = [
-                            d.name for d in sandboxes_dir.iterdir() if d.is_dir()
-                        ]
-            except Exception:
-                # If we can't find project root, continue with running sandboxes only
-                pass
-
-        # Merge: running sandboxes first (in order from ps), then filesystem sandboxes
-        # Deduplicate while preserving order
-        all_names = list(dict.fromkeys(running_sandboxes + filesystem_sandboxes))
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return
+            f.truncate(0)
+            json.dump({"ts": time.time(), "names": names}, f)
+    except OSError:
+        pass
+
+
+def _cached_sandbox_names(cwd: Path, all_namespaces: bool) -> list[str]:
+    """Get sandbox names, reusing recent results from the on-disk cache.
+
+    Shells invoke completion repeatedly while typing, so results are cached
+    for COMPLETION_CACHE_TTL seconds to avoid querying Docker on every TAB.
+
+    Args:
+        cwd: Directory completion was invoked from.
+        all_namespaces: Whether to include sandboxes from all projects.
+
+    Returns:
+        List of sandbox names.
+    """
+    cache_path = _completion_cache_path(cwd, all_namespaces)
+    try:
+        with open(cache_path) as f:
+            data = json.load(f)
+        if time.time() - data["ts"] < COMPLETION_CACHE_TTL:
+            return list(data["names"])
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    names = _list_sandbox_names(all_namespaces)
+    _write_completion_cache(cache_path, names)
+    return names
+
+
+def complete_sandbox_names(ctx, param, incomplete):
+    """Complete sandbox names from running containers and filesystem."""
+    try:
+        # Check if -a/--all flag is set
+        all_namespaces = ctx.params.get("all", False)
+
+        all_names = _cached_sandbox_names(Path.cwd(), all_namespaces)
+
+        # Nothing typed yet: every name matches
+        if not incomplete:
+            return all_names
 
         # Filter by incomplete prefix
         matches = [name for name in all_names if name.startswith(incomplete)]
@@ -71,16 +192,33 @@ def complete_sandbox_names(ctx, param, incomplete):
         return []
 
 
-def get_manager(auto_init: bool = False) -> SandboxManager:
+def get_manager(auto_init: bool = False) -> "SandboxManager":
     """Get a SandboxManager instance, handling errors gracefully.
 
+    The manager is stored on the root Click context, so repeated calls
+    within one invocation reuse it instead of rediscovering the project.
+
     Args:
         auto_init: If True, prompt to initialize devcontainer if not found.
     """
+    ctx = click.get_current_context(silent=True)
+    obj = ctx.find_root().ensure_object(dict) if ctx else {}
+    if "manager" not in obj:
+        obj["manager"] = _create_manager(auto_init)
+    return obj["manager"]
+
+
+def _create_manager(auto_init: bool) -> "SandboxManager":
+    """Construct a SandboxManager, offering to initialize if requested."""
+    console = _console()
+    from .manager import SandboxManager
+
     try:
         return SandboxManager()
     except ValueError as e:
         if auto_init and "Could not find devcontainer.json" in str(e):
+            from .init import create_devcontainer, find_git_root
+
             # Offer to initialize
             git_root = find_git_root()
             if git_root:
@@ -88,12 +226,12 @@ def get_manager(auto_init: bool = False) -> SandboxManager:
                     f"[yellow]No devcontainer.json found in {git_root}[/yellow]"
                 )
                 if click.confirm("Would you like to create one?", default=True):
-                    create_devcontainer(git_root)
+                    devcontainer_file = create_devcontainer(git_root)
                     console.print(
                         "[green]Created .devcontainer/devcontainer.json[/green]"
                     )
                     console.print()
-                    return SandboxManager()
+                    return SandboxManager(devcontainer_file=devcontainer_file)
 
         console.print(f"[red]Error:[/red] {e}")
         sys.exit(1)
@@ -101,9 +239,11 @@ def get_manager(auto_init: bool = False) -> SandboxManager:
 
 @click.group()
 @click.version_option()
-def main():
+@click.pass_context
+def main(ctx: click.Context):
     """agent-sandbox: Create sandboxed development environments using git worktrees and Docker."""
-    pass
+    # Shared per-invocation state, e.g. the SandboxManager from get_manager()
+    ctx.ensure_object(dict)
 
 
 @main.command()
@@ -113,8 +253,14 @@ def main():
     type=click.Path(exists=True),
     help="Project path (default: current directory)",
 )
-def init(path: str | None):
+@click.option(
+    "--yes", "-y", is_flag=True, help="Overwrite an existing config without prompting"
+)
+def init(path: str | None, yes: bool):
     """Initialize a devcontainer configuration for agent-sandbox."""
+    console = _console()
+    from .init import create_devcontainer, find_git_root
+
     project_path = Path(path) if path else Path.cwd()
 
     # Check if we're in a git repo
@@ -128,7 +274,7 @@ def init(path: str | None):
     # Check if devcontainer already exists
     if find_project_root(project_path):
         console.print("[yellow]devcontainer.json already exists.[/yellow]")
-        if not click.confirm("Overwrite?", default=False):
+        if not yes and not click.confirm("Overwrite?", default=False):
             return
 
     create_devcontainer(git_root)
@@ -146,6 +292,7 @@ def init(path: str | None):
 @click.argument("name", shell_complete=complete_sandbox_names)
 def stop(name: str):
     """Stop a sandbox."""
+    console = _console()
     manager = get_manager()
 
     with console.status(f"[bold blue]Stopping sandbox '{name}'...", spinner="dots"):
@@ -162,14 +309,16 @@ def stop(name: str):
 )
 def stopall(all: bool):
     """Stop all running sandboxes."""
+    console = _console()
     manager = get_manager()
 
+    stopped = []
     with console.status("[bold blue]Stopping all sandboxes...", spinner="dots"):
-        stopped = manager.stop_all(all_namespaces=all)
+        for name in manager.iter_stop_all(all_namespaces=all):
+            console.print(f"  [dim]Stopped:[/dim] {name}", highlight=False)
+            stopped.append(name)
 
     if stopped:
-        for name in stopped:
-            console.print(f"  [dim]Stopped:[/dim] {name}")
         console.print("[green]All sandboxes stopped.[/green]")
     else:
         if all:
@@ -183,6 +332,7 @@ def stopall(all: bool):
 @click.argument("name", shell_complete=complete_sandbox_names)
 def rm(name: str):
     """Remove a sandbox and its clone."""
+    console = _console()
     manager = get_manager()
 
     with console.status(f"[bold blue]Removing sandbox '{name}'...", spinner="dots"):
@@ -199,9 +349,29 @@ def rm(name: str):
 )
 def list_sandboxes(all: bool):
     """List all running sandboxes."""
+    from concurrent.futures import ThreadPoolExecutor
+
     manager = get_manager()
+    title = (
+        "Running Sandboxes"
+        if all
+        else f"Running Sandboxes ({manager._docker.namespace})"
+    )
+
+    # Query Docker in the background while rich is imported and the table
+    # is set up, since the docker and git calls dominate the command's time.
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(manager.list, all_namespaces=all)
 
-    sandboxes = manager.list(all_namespaces=all)
+        console = _console()
+        from rich.table import Table
+
+        table = Table(title=title)
+        table.add_column("Name", style="cyan")
+        table.add_column("Branch", style="green")
+        table.add_column("Ports", style="yellow")
+
+        sandboxes = future.result()
 
     if not sandboxes:
         if all:
@@ -211,23 +381,47 @@ def list_sandboxes(all: bool):
             console.print("Use -a to see sandboxes from all projects.")
         return
 
-    title = (
-        "Running Sandboxes"
-        if all
-        else f"Running Sandboxes ({manager._docker.namespace})"
-    )
-    table = Table(title=title)
-    table.add_column("Name", style="cyan")
-    table.add_column("Branch", style="green")
-    table.add_column("Ports", style="yellow")
-
     for sandbox in sandboxes:
-        ports_str = ", ".join(f"{cp}:{hp}" for cp, hp in sandbox.ports.items())
-        table.add_row(sandbox.name, sandbox.branch, ports_str)
+        table.add_row(sandbox.name, sandbox.branch, sandbox.ports_str)
 
     console.print(table)
 
 
+class _BuildLog:
+    """The last few lines of build output, rendered when Live refreshes.
+
+    The rendered Text is kept until new output arrives, so refreshes while
+    the build is quiet (e.g. a long RUN step) reuse it instead of joining
+    and re-measuring the lines again.
+
+    Lines are appended from the thread running the build while Live's
+    refresh thread renders, so both go through a lock.
+    """
+
+    def __init__(self, maxlen: int):
+        self._lines: deque[str] = deque(maxlen=maxlen)
+        self._text: "Text | None" = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._lines)
+
+    def append(self, line: str) -> None:
+        with self._lock:
+            self._lines.append(line)
+            self._text = None
+
+    def __rich__(self) -> "Text":
+        with self._lock:
+            text = self._text
+            if text is None:
+                from rich.text import Text
+
+                text = self._text = Text("\n".join(self._lines), style="dim")
+            return text
+
+
 @main.command()
 @click.option(
     "--all",
@@ -250,6 +444,15 @@ def connect(
     all: bool, name: str | None, shell: str | None, branch: str | None, yes: bool
 ):
     """Connect to a sandbox's shell. Starts the sandbox if not running."""
+    console = _console()
+    from rich.console import Group
+    from rich.live import Live
+    from rich.panel import Panel
+    from rich.spinner import Spinner
+
+    from .config import get_default_shell
+    from .docker import ContainerState
+
     if name is None:
         project_root = find_project_root()
         if not project_root:
@@ -262,48 +465,52 @@ def connect(
 
     manager = get_manager(auto_init=True)
 
-    # Check if sandbox is running, if not offer to start it
-    if not manager._docker.container_exists(name):
+    # Check if sandbox is running, if not offer to start it. The state is
+    # passed to start() so it doesn't have to query Docker again.
+    state = manager.state(name)
+    if state != ContainerState.RUNNING:
         if not yes and not click.confirm(
             f"Sandbox '{name}' is not running. Start it?", default=True
         ):
             return
 
         try:
-            # State for the live display
-            current_status = "Starting sandbox..."
-            build_lines: deque[str] = deque(maxlen=BUILD_LOG_LINES)
-
-            def make_display() -> Group:
-                """Create the live display content."""
-                items = []
-                # Spinner with current status
-                items.append(Spinner("dots", text=f"[bold blue]{current_status}"))
-                # Build log panel if we have output
-                if build_lines:
-                    log_text = Text("\n".join(build_lines), style="dim")
-                    items.append(
-                        Panel(log_text, title="Build Output", border_style="blue")
-                    )
-                return Group(*items)
+            # The live display is built once; Live redraws it at
+            # refresh_per_second, so output callbacks only record state and
+            # rendering happens at most 10 times a second. Build output
+            # arrives on the image build thread, so it only goes into the
+            # locked build log, and the display itself is never modified.
+            build_log = _BuildLog(BUILD_LOG_LINES)
+            spinner = Spinner("dots", text="[bold blue]Starting sandbox...")
+            log_panel = Panel(build_log, title="Build Output", border_style="blue")
+            with_log = Group(spinner, log_panel)
+            current_step = None
+
+            def display() -> "RenderableType":
+                # Build log panel is only shown once we have output
+                return with_log if build_log else spinner
 
             def on_progress(step: str) -> None:
-                nonlocal current_status
-                current_status = step
+                nonlocal current_step
+                if step != current_step:
+                    current_step = step
+                    spinner.update(text=f"[bold blue]{step}")
 
             def on_build_output(line: str) -> None:
-                build_lines.append(line)
-                live.update(make_display())
+                build_log.append(line)
 
-            with Live(make_display(), console=console, refresh_per_second=10) as live:
+            with Live(
+                get_renderable=display, console=console, refresh_per_second=10
+            ) as live:
                 info = manager.start(
                     name,
                     branch,
                     on_progress=on_progress,
                     on_build_output=on_build_output,
+                    state=state,
                 )
-                # Update display one more time in case of final status
-                live.update(make_display())
+                # Refresh one more time in case of final status
+                live.refresh()
 
             console.print(f"[green]Sandbox '{name}' started![/green]")
             console.print(f"  [dim]Path:[/dim]    {info.sandbox_path}")
@@ -316,20 +523,24 @@ def connect(
 
     # Determine which shell to use
     actual_shell = shell or get_default_shell() or "/bin/bash"
-    shell_name = actual_shell.split("/")[-1]  # Extract 'bash' from '/bin/bash'
+    shell_name = os.path.basename(actual_shell)  # Extract 'bash' from '/bin/bash'
     console.print(f"Connecting to sandbox '{name}' with {shell_name}...")
 
     try:
-        manager.connect(name, actual_shell)
+        status = manager.connect(name, actual_shell)
     except RuntimeError as e:
         console.print(f"[red]Error:[/red] {e}")
         sys.exit(1)
 
+    # Exit with the shell's status so scripts running connect can see it
+    sys.exit(status)
+
 
 @main.command()
 @click.argument("name", shell_complete=complete_sandbox_names)
 def ports(name: str):
     """Show ports for a sandbox."""
+    console = _console()
     manager = get_manager()
 
     port_map = manager.ports(name)
@@ -339,8 +550,15 @@ def ports(name: str):
         return
 
     console.print(f"[bold]Ports for '{name}':[/bold]")
-    for container_port, host_port in port_map.items():
-        console.print(f"  {container_port}/tcp -> 0.0.0.0:{host_port}")
+    # One plain-text write: no markup parsing or highlighter regex pass
+    console.print(
+        "\n".join(
+            f"  {container_port}/tcp -> 0.0.0.0:{host_port}"
+            for container_port, host_port in port_map.items()
+        ),
+        markup=False,
+        highlight=False,
+    )
 
 
 @main.command()
@@ -348,7 +566,11 @@ def ports(name: str):
 def logs(name: str):
     """Show logs for a sandbox."""
     manager = get_manager()
-    manager.logs(name)
+    try:
+        manager.logs(name)
+    except KeyboardInterrupt:
+        # Ctrl-C is the normal way to stop following logs
+        pass
 
 
 @main.command()
@@ -360,6 +582,7 @@ def merge(name: str):
     into your current branch. The sandbox must have pushed its changes
     first (git push origin sandbox/<name>).
     """
+    console = _console()
     manager = get_manager()
 
     with console.status(f"[bold blue]Merging sandbox '{name}'...", spinner="dots"):
@@ -374,67 +597,73 @@ def merge(name: str):
 
 def _detect_shell() -> str | None:
     """Auto-detect current shell from environment."""
-    shell_path = os.environ.get("SHELL", "")
-    if "bash" in shell_path:
-        return "bash"
-    elif "zsh" in shell_path:
-        return "zsh"
-    elif "fish" in shell_path:
-        return "fish"
-    return None
-
+    # Match the executable name exactly, e.g. /usr/local/bin/bashful is not bash
+    shell_name = os.path.basename(os.environ.get("SHELL", ""))
+    return shell_name if shell_name in SUPPORTED_SHELLS else None
 
-def _get_program_name() -> str:
-    """Get the program name for completion environment variable."""
-    return "AGENT_SANDBOX"
 
+# Program name used in the completion environment variable
+PROGRAM_NAME = "AGENT_SANDBOX"
 
-def _generate_completion_instructions(shell: str, program_name: str) -> str:
-    """Generate shell-specific installation instructions."""
-
-    instructions = {
-        "bash": f"""
+# Shell-specific installation instructions, formatted once at import
+_COMPLETION_INSTRUCTIONS = {
+    "bash": f"""
 [Bash Completion]
 
 Add this to your ~/.bashrc:
-    eval "$(_{program_name}_COMPLETE=bash_source agent-sandbox)"
+    eval "$(_{PROGRAM_NAME}_COMPLETE=bash_source agent-sandbox)"
 
 Or save the script and source it:
-    _{program_name}_COMPLETE=bash_source agent-sandbox > ~/.agent-sandbox-complete.bash
+    _{PROGRAM_NAME}_COMPLETE=bash_source agent-sandbox > ~/.agent-sandbox-complete.bash
     echo 'source ~/.agent-sandbox-complete.bash' >> ~/.bashrc
 
 Then restart your shell or run: source ~/.bashrc
-        """.strip(),
-        "zsh": f"""
+    """.strip(),
+    "zsh": f"""
 [Zsh Completion]
 
 Add this to your ~/.zshrc:
-    eval "$(_{program_name}_COMPLETE=zsh_source agent-sandbox)"
+    eval "$(_{PROGRAM_NAME}_COMPLETE=zsh_source agent-sandbox)"
 
 Or save to completion directory:
     mkdir -p ~/.zfunc
-    _{program_name}_COMPLETE=zsh_source agent-sandbox > ~/.zfunc/_agent-sandbox
+    _{PROGRAM_NAME}_COMPLETE=zsh_source agent-sandbox > ~/.zfunc/_agent-sandbox
     echo 'fpath+=~/.zfunc' >> ~/.zshrc
     echo 'autoload -U compinit && compinit' >> ~/.zshrc
 
 Then restart your shell or run: source ~/.zshrc
-        """.strip(),
-        "fish": f"""
+    """.strip(),
+    "fish": f"""
 [Fish Completion]
 
 Save this script:
-    _{program_name}_COMPLETE=fish_source agent-sandbox > ~/.config/fish/completions/agent-sandbox.fish
+    _{PROGRAM_NAME}_COMPLETE=fish_source agent-sandbox > ~/.config/fish/completions/agent-sandbox.fish
 
 Then restart fish or run:
     source ~/.config/fish/completions/agent-sandbox.fish
-        """.strip(),
-    }
+    """.strip(),
+}
+
+_POST_INSTALL_INSTRUCTIONS = {
+    "bash": "[yellow]Restart your shell or run:[/yellow] source ~/.bashrc",
+    "zsh": "[yellow]Restart your shell or run:[/yellow] source ~/.zshrc",
+    "fish": "[yellow]Restart fish or run:[/yellow] source ~/.config/fish/completions/agent-sandbox.fish",
+}
 
-    return instructions.get(shell, f"Shell '{shell}' is not supported.")
+
+def _get_program_name() -> str:
+    """Get the program name for completion environment variable."""
+    return PROGRAM_NAME
+
+
+def _generate_completion_instructions(shell: str) -> str:
+    """Generate shell-specific installation instructions."""
+    return _COMPLETION_INSTRUCTIONS.get(shell, f"Shell '{shell}' is not supported.")
 
 
 def _install_completion_script(shell: str, program_name: str) -> None:
     """Install completion script to appropriate location."""
+    console = _console()
     home = Path.home()
 
     # Define installation paths
@@ -456,21 +685,22 @@ def _install_completion_script(shell: str, program_name: str) -> None:
             console.print(
                 "[yellow]Try running with sudo or use manual installation:[/yellow]"
             )
-            console.print(_generate_completion_instructions(shell, program_name))
+            console.print(_generate_completion_instructions(shell))
             return
 
-    # Generate the completion script using Click's built-in system
-    env_var = f"_{program_name}_COMPLETE={shell}_source"
+    # Generate the completion script in-process using Click's built-in system
+    from click.shell_completion import get_completion_class
+
+    completion_class = get_completion_class(shell)
+    if completion_class is None:
+        console.print(f"[red]Error:[/red] Shell '{shell}' is not supported.")
+        return
+    source = completion_class(
+        main, {}, "agent-sandbox", f"_{program_name}_COMPLETE"
+    ).source()
 
     try:
-        result = subprocess.run(
-            ["agent-sandbox"],
-            capture_output=True,
-            text=True,
-            check=True,
-            env={**os.environ, env_var: f"{shell}_source"},
-        )
-        script_path.write_text(result.stdout)
+        script_path.write_text(source)
 
         console.print(f"[green]✓[/green] Installed {shell} completion to:")
         console.print(f"  [dim]{script_path}[/dim]")
@@ -478,37 +708,67 @@ def _install_completion_script(shell: str, program_name: str) -> None:
         # Provide shell-specific next steps
         _print_post_install_instructions(shell)
 
-    except subprocess.CalledProcessError as e:
-        console.print(f"[red]Error:[/red] Failed to generate completion script: {e}")
     except PermissionError:
         console.print(f"[red]Error:[/red] Cannot write to {script_path}")
         console.print(
             "[yellow]Try running with sudo or use manual installation:[/yellow]"
         )
-        console.print(_generate_completion_instructions(shell, program_name))
+        console.print(_generate_completion_instructions(shell))
 
 
 def _print_post_install_instructions(shell: str) -> None:
     """Print shell-specific post-installation instructions."""
+    console = _console()
+    console.print(
+        _POST_INSTALL_INSTRUCTIONS.get(
+            shell, "Restart your shell to enable completion."
+        )
+    )
 
-    instructions = {
-        "bash": "[yellow]Restart your shell or run:[/yellow] source ~/.bashrc",
-        "zsh": "[yellow]Restart your shell or run:[/yellow] source ~/.zshrc",
-        "fish": "[yellow]Restart fish or run:[/yellow] source ~/.config/fish/completions/agent-sandbox.fish",
-    }
 
-    console.print(instructions.get(shell, "Restart your shell to enable completion."))
+def _get_bash_version_output() -> str:
+    """Get the first line of `bash --version`, cached per bash binary.
+
+    The cache is keyed by the binary's path and mtime so upgrading bash
+    invalidates it.
+
+    Returns:
+        Version line, or empty string if bash is not installed.
+    """
+    bash_path = shutil.which("bash")
+    if not bash_path:
+        return ""
+
+    key = f"{bash_path}:{os.stat(bash_path).st_mtime_ns}"
+    cache_path = _cache_dir() / "bash_version"
+    try:
+        cached = json.loads(cache_path.read_text())
+        if isinstance(cached, dict) and key in cached:
+            return cached[key]
+    except (OSError, ValueError):
+        pass
+
+    result = subprocess.run([bash_path, "--version"], capture_output=True, text=True)
+    output = result.stdout.split("\n", 1)[0]
+
+    if result.returncode == 0:
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            cache_path.write_text(json.dumps({key: output}))
+        except OSError:
+            pass
+
+    return output
 
 
 def _validate_shell_requirements(shell: str) -> None:
     """Validate shell version requirements and provide helpful warnings."""
+    console = _console()
 
     if shell == "bash":
         try:
-            result = subprocess.run(
-                ["bash", "--version"], capture_output=True, text=True
-            )
-            version_str = result.stdout.split()[2] if result.stdout else ""
+            output = _get_bash_version_output()
+            version_str = output.split()[2] if output else ""
             version_parts = version_str.split(".")
             if len(version_parts) >= 2:
                 major, minor = int(version_parts[0]), int(version_parts[1])
@@ -517,12 +777,12 @@ def _validate_shell_requirements(shell: str) -> None:
                         f"[yellow]Warning:[/yellow] Bash completion requires version 4.4+. "
                         f"Found: {major}.{minor}"
                     )
-        except (subprocess.SubprocessError, IndexError, ValueError):
+        except (OSError, subprocess.SubprocessError, IndexError, ValueError):
             console.print("[yellow]Warning:[/yellow] Could not detect bash version")
 
 
 @main.command()
-@click.argument("shell", required=False, type=click.Choice(["bash", "zsh", "fish"]))
+@click.argument("shell", required=False, type=click.Choice(SUPPORTED_SHELLS))
 @click.option(
     "--install",
     is_flag=True,
@@ -538,6 +798,7 @@ def completion(shell: str | None, install: bool):
         agent-sandbox completion bash          # Show bash installation instructions
         agent-sandbox completion fish --install # Auto-install fish completion
     """
+    console = _console()
     program_name = _get_program_name()
 
     # Auto-detect shell if not provided
@@ -555,7 +816,7 @@ def completion(shell: str | None, install: bool):
     if install:
         _install_completion_script(shell, program_name)
     else:
-        instructions = _generate_completion_instructions(shell, program_name)
+        instructions = _generate_completion_instructions(shell)
         console.print(instructions)
         console.print()
         console.print(
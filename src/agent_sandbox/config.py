@@ -1,40 +1,59 @@
 """Configuration management for agent-sandbox."""
 
-import sys
+import copy
+import os
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 
-if sys.version_info >= (3, 11):
+try:
     import tomllib
-else:
+except ImportError:  # Python < 3.11
     import tomli as tomllib
 
 # Config file names to search for (in order of priority)
 PROJECT_CONFIG_NAMES = ["agent-sandbox.toml", ".agent-sandbox.toml"]
 
 
-def find_project_config() -> Optional[Path]:
+def find_project_config(start_path: Optional[Path] = None) -> Optional[Path]:
     """Find project-level config file by searching up from cwd.
 
+    Args:
+        start_path: Directory to start searching from. Defaults to cwd.
+
     Returns:
         Path to config file, or None if not found.
     """
-    current = Path.cwd().resolve()
+    if start_path is None:
+        start_path = os.getcwd()
+
+    return _find_project_config(os.path.realpath(start_path))
 
-    while current != current.parent:
-        for name in PROJECT_CONFIG_NAMES:
-            config_path = current / name
-            if config_path.exists():
-                return config_path
-        current = current.parent
 
-    # Check root directory
-    for name in PROJECT_CONFIG_NAMES:
-        config_path = current / name
-        if config_path.exists():
-            return config_path
+@lru_cache(maxsize=32)
+def _find_project_config(start_path: str) -> Optional[Path]:
+    """Search upward from a resolved path, memoized for the process lifetime.
 
-    return None
+    Lists each directory once with os.scandir rather than stat-ing every
+    candidate name, and works on plain strings until a match is found.
+    """
+    current = start_path
+
+    while True:
+        try:
+            with os.scandir(current) as it:
+                names = {entry.name for entry in it}
+        except OSError:
+            names = set()
+
+        for name in PROJECT_CONFIG_NAMES:
+            if name in names:
+                return Path(current, name)
+
+        parent = os.path.dirname(current)
+        if parent == current:
+            return None
+        current = parent
 
 
 def get_user_config_path() -> Path:
@@ -55,6 +74,22 @@ def load_config_file(config_path: Path) -> dict:
     Returns:
         Dict with configuration, or empty dict if file is invalid.
     """
+    try:
+        st = os.stat(config_path)
+    except OSError:
+        return {}
+
+    # Keyed on mtime and size so an edited file is parsed again
+    return _load_config_file(str(config_path), st.st_mtime_ns, st.st_size)
+
+
+@lru_cache(maxsize=8)
+def _load_config_file(config_path: str, mtime_ns: int, size: int) -> dict:
+    """Parse a TOML config file, memoized per file version.
+
+    Every config getter goes through load_config(), so without this the same
+    files would be re-read and re-parsed several times per command.
+    """
     try:
         with open(config_path, "rb") as f:
             return tomllib.load(f)
@@ -62,6 +97,17 @@ def load_config_file(config_path: Path) -> dict:
         return {}
 
 
+def clear_config_cache() -> None:
+    """Forget memoized config lookups.
+
+    Call after creating a project config file so later lookups see it.
+    """
+    _find_project_config.cache_clear()
+    _load_config_file.cache_clear()
+    _load_config.cache_clear()
+    _load_settings.cache_clear()
+
+
 def load_config() -> dict:
     """Load configuration with project config taking priority over user config.
 
@@ -69,18 +115,30 @@ def load_config() -> dict:
     1. Project config (agent-sandbox.toml or .agent-sandbox.toml in cwd or parents)
     2. User config (~/.agent-sandbox.toml)
 
+    The merged result is memoized per working directory, so the getters
+    below cost a dict lookup after the first call. Use clear_config_cache()
+    to pick up config files changed within the same process.
+
     Returns:
         Merged configuration dict.
     """
+    # Deep copy so callers can't modify the cached config, including its
+    # nested tables (e.g. [shell])
+    return copy.deepcopy(_load_config(os.getcwd()))
+
+
+@lru_cache(maxsize=8)
+def _load_config(cwd: str) -> dict:
+    """Load and merge the user and project config for a working directory."""
     config: dict = {}
 
     # Load user config first (lower priority)
     user_config_path = get_user_config_path()
     if user_config_path.exists():
-        config = load_config_file(user_config_path)
+        config = dict(load_config_file(user_config_path))
 
     # Load project config (higher priority, overrides user config)
-    project_config_path = find_project_config()
+    project_config_path = find_project_config(cwd)
     if project_config_path:
         project_config = load_config_file(project_config_path)
         # Merge: project config overrides user config
@@ -89,7 +147,69 @@ def load_config() -> dict:
     return config
 
 
-def get_default_shell() -> Optional[str]:
+def _section(config: dict, name: str) -> dict:
+    """Get a config table, treating a missing or non-table value as empty."""
+    value = config.get(name)
+    return value if isinstance(value, dict) else {}
+
+
+def _flatten_config(config: dict) -> dict:
+    """Resolve the settings read by the getters into one flat dict.
+
+    Section lookups, precedence and type checks happen here once per loaded
+    config, so each getter is a single dict lookup.
+    """
+    sandbox = _section(config, "sandbox")
+    defaults = _section(config, "defaults")
+    git = _section(config, "git")
+    shell = _section(config, "shell")
+    files = _section(config, "files")
+
+    # Default shell: [sandbox].default_shell, then [defaults].shell, then a
+    # top-level 'shell' (unless that is the [shell] table of init commands)
+    if "default_shell" in sandbox:
+        default_shell = sandbox["default_shell"]
+    elif "shell" in defaults:
+        default_shell = defaults["shell"]
+    elif not isinstance(config.get("shell"), dict):
+        default_shell = config.get("shell")
+    else:
+        default_shell = None
+
+    init_commands = shell.get("init", [])
+    if isinstance(init_commands, str):
+        init_commands = [init_commands]
+    elif not isinstance(init_commands, list):
+        init_commands = []
+
+    mounts = files.get("mounts", [])
+    if not isinstance(mounts, list):
+        mounts = []
+
+    return {
+        "shell": default_shell,
+        "git.name": git.get("name"),
+        "git.email": git.get("email"),
+        "shell.init": tuple(cmd for cmd in init_commands if isinstance(cmd, str)),
+        "files.mounts": tuple(m for m in mounts if isinstance(m, str) and ":" in m),
+        "files.resolve_symlinks": files.get("resolve_symlinks") is True,
+    }
+
+
+def _settings(config: Optional[dict]) -> dict:
+    """Get the flattened settings for a config, or for load_config()."""
+    if config is None:
+        return _load_settings(os.getcwd())
+    return _flatten_config(config)
+
+
+@lru_cache(maxsize=8)
+def _load_settings(cwd: str) -> dict:
+    """Flatten the loaded config for a working directory, memoized."""
+    return _flatten_config(_load_config(cwd))
+
+
+def get_default_shell(config: Optional[dict] = None) -> Optional[str]:
     """Get the default shell from configuration.
 
     Checks multiple locations in order:
@@ -97,123 +217,97 @@ def get_default_shell() -> Optional[str]:
     2. [defaults].shell
     3. Top-level 'shell'
 
+    Args:
+        config: Already loaded configuration. Defaults to load_config().
+
     Returns:
         Shell path from config, or None if not configured.
     """
-    config = load_config()
+    return _settings(config)["shell"]
 
-    # Check [sandbox].default_shell
-    sandbox_config = config.get("sandbox", {})
-    if isinstance(sandbox_config, dict) and "default_shell" in sandbox_config:
-        return sandbox_config["default_shell"]
 
-    # Check [defaults].shell
-    defaults_config = config.get("defaults", {})
-    if isinstance(defaults_config, dict) and "shell" in defaults_config:
-        return defaults_config["shell"]
-
-    # Fall back to top-level 'shell'
-    return config.get("shell")
-
-
-def get_git_name() -> Optional[str]:
+def get_git_name(config: Optional[dict] = None) -> Optional[str]:
     """Get the git user name from configuration.
 
+    Args:
+        config: Already loaded configuration. Defaults to load_config().
+
     Returns:
         Git user name from config, or None if not configured.
     """
-    config = load_config()
-    git_config = config.get("git", {})
-    if isinstance(git_config, dict):
-        return git_config.get("name")
-    return None
+    return _settings(config)["git.name"]
 
 
-def get_git_email() -> Optional[str]:
+def get_git_email(config: Optional[dict] = None) -> Optional[str]:
     """Get the git user email from configuration.
 
+    Args:
+        config: Already loaded configuration. Defaults to load_config().
+
     Returns:
         Git user email from config, or None if not configured.
     """
-    config = load_config()
-    git_config = config.get("git", {})
-    if isinstance(git_config, dict):
-        return git_config.get("email")
-    return None
+    return _settings(config)["git.email"]
 
 
-def get_shell_init() -> list[str]:
+def get_shell_init(config: Optional[dict] = None) -> list[str]:
     """Get shell initialization commands from configuration.
 
     These commands are run before starting the shell when connecting to a sandbox.
     Useful for setting up environment (e.g., direnv hooks).
 
+    Args:
+        config: Already loaded configuration. Defaults to load_config().
+
     Returns:
         List of shell commands to run.
     """
-    config = load_config()
-    shell_config = config.get("shell", {})
-
-    if not isinstance(shell_config, dict):
-        return []
-
-    init_commands = shell_config.get("init", [])
-
-    if isinstance(init_commands, str):
-        return [init_commands]
-
-    if isinstance(init_commands, list):
-        return [cmd for cmd in init_commands if isinstance(cmd, str)]
-
-    return []
+    return list(_settings(config)["shell.init"])
 
 
 def get_mounts(
-    project_root: Optional[Path] = None, workdir: Optional[str] = None
+    project_root: Optional[Path] = None,
+    workdir: Optional[str] = None,
+    config: Optional[dict] = None,
 ) -> list[tuple[str, str]]:
     """Get file mounts from configuration.
 
     Mounts are specified as "source:dest" strings in [files].mounts array.
     Source paths support ~ expansion and relative paths (resolved from project root).
+    Sources are normalized lexically; set [files].resolve_symlinks = true to
+    also resolve symlinks.
     Destination paths support $WORKSPACE or ${WORKSPACE} expansion to the container
     workspace folder (workdir parameter).
 
     Args:
         project_root: Project root for resolving relative paths. Defaults to cwd.
         workdir: Container workspace folder for $WORKSPACE expansion.
+        config: Already loaded configuration. Defaults to load_config().
 
     Returns:
         List of (source, dest) tuples with absolute source paths.
     """
-    config = load_config()
-    files_config = config.get("files", {})
-
-    if not isinstance(files_config, dict):
+    settings = _settings(config)
+    mounts_list = settings["files.mounts"]
+    if not mounts_list:
         return []
 
-    mounts_list = files_config.get("mounts", [])
-
-    if not isinstance(mounts_list, list):
-        return []
-
-    if project_root is None:
-        project_root = Path.cwd()
+    root = os.getcwd() if project_root is None else str(project_root)
+    resolve_symlinks = settings["files.resolve_symlinks"]
 
     mounts = []
     for mount in mounts_list:
-        if not isinstance(mount, str):
-            continue
-        if ":" not in mount:
-            continue
-
         # Split on first colon only (dest paths might have colons on Windows)
         source, dest = mount.split(":", 1)
 
-        # Expand ~ and resolve relative paths for source
-        source_path = Path(source).expanduser()
-        if not source_path.is_absolute():
-            source_path = project_root / source_path
-        source = str(source_path.resolve())
+        # Expand ~ and make relative sources absolute from the project root
+        source = os.path.expanduser(source)
+        if not os.path.isabs(source):
+            source = os.path.join(root, source)
+        if resolve_symlinks:
+            source = os.path.realpath(source)
+        else:
+            source = os.path.normpath(source)
 
         # Expand $WORKSPACE or ${WORKSPACE} in destination path
         if workdir:
@@ -1,10 +1,18 @@
 """Docker operations for agent-sandbox."""
 
+import hashlib
+import json
 import os
 import re
+import socket
 import subprocess
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import Callable, Optional
+from typing import IO, Any, Callable, Iterator, Optional
 
 from enum import Enum
 
@@ -29,39 +37,525 @@ OutputCallback = Callable[[str], None]
 # Label used to identify sandbox containers
 SANDBOX_LABEL = "agent-sandbox.managed=true"
 
+# Image label recording the hash of the Dockerfile an image was built from
+BUILD_HASH_LABEL = "agent-sandbox.build-hash"
 
+# Socket the docker CLI talks to when no host or context is configured
+DEFAULT_DOCKER_SOCKET = "/var/run/docker.sock"
+
+# Seconds to wait on the Docker Engine API before falling back to the CLI
+DOCKER_API_TIMEOUT = 2.0
+
+# Seconds docker stop waits after SIGTERM before killing the container.
+# The container's main process is `sleep infinity`, which as PID 1 ignores
+# SIGTERM, so waiting (docker's default is 10s) never helps. The workspace
+# lives on the host, so nothing is lost by killing it straight away.
+STOP_TIMEOUT = 0
+
+# Seconds to reuse per-container query results (state, ports, name)
+METADATA_CACHE_TTL = 2.0
+
+# Bytes read at a time from streamed docker build output
+BUILD_OUTPUT_READ_SIZE = 65536
+
+# Number of trailing docker output lines included in error messages
+ERROR_OUTPUT_LINES = 20
+
+
+@dataclass(slots=True)
+class SandboxContainer:
+    """A running sandbox container as reported by docker ps."""
+
+    container_name: str
+    sandbox_name: str
+    ports: dict[int, int]  # container_port -> host_port
+
+
+# Characters not allowed in Docker container and image names
+_INVALID_NAME_CHARS = re.compile(r"[^a-zA-Z0-9_.-]")
+
+# The same rule for ASCII as a str.translate table (invalid character -> "-")
+_NAME_TRANSLATION = str.maketrans(
+    {c: "-" for c in map(chr, range(128)) if not (c.isalnum() or c in "_.-")}
+)
+
+
+@lru_cache(maxsize=256)
 def sanitize_docker_name(name: str) -> str:
     """Sanitize a name for use in Docker container/image names.
 
     Docker names must match [a-zA-Z0-9][a-zA-Z0-9_.-]*
 
+    Memoized, since container_name and image_name are called with the same
+    sandbox name many times per command.
+
     Args:
         name: The name to sanitize.
 
     Returns:
         A sanitized name safe for Docker.
     """
-    # Replace / with -
-    sanitized = name.replace("/", "-")
-    # Replace any other invalid characters with -
-    sanitized = re.sub(r"[^a-zA-Z0-9_.-]", "-", sanitized)
+    # Replace / and any other invalid ASCII characters with -
+    sanitized = name.translate(_NAME_TRANSLATION)
+    # The table only covers ASCII; replace anything else the slow way
+    if not sanitized.isascii():
+        sanitized = _INVALID_NAME_CHARS.sub("-", sanitized)
     # Ensure it starts with alphanumeric
     if sanitized and not sanitized[0].isalnum():
         sanitized = "x" + sanitized
     return sanitized
 
 
+def local_docker_socket() -> Optional[str]:
+    """Get the unix socket the docker CLI talks to, if it is a local one.
+
+    Returns:
+        Socket path, or None for remote hosts (tcp://, ssh://) and
+        non-default docker contexts.
+    """
+    docker_host = os.environ.get("DOCKER_HOST", "")
+    if docker_host:
+        if not docker_host.startswith("unix://"):
+            return None
+        return docker_host[len("unix://") :]
+
+    if os.environ.get("DOCKER_CONTEXT"):
+        return None
+    try:
+        config_path = Path.home() / ".docker" / "config.json"
+        with open(config_path) as f:
+            context = json.load(f).get("currentContext")
+        if context and context != "default":
+            return None
+    except (OSError, ValueError, AttributeError):
+        pass
+    return DEFAULT_DOCKER_SOCKET
+
+
+def docker_daemon_reachable(timeout: float = 0.1) -> bool:
+    """Quickly check whether the Docker daemon socket accepts connections.
+
+    Only local unix sockets are probed. Remote hosts (tcp://, ssh://) and
+    non-default docker contexts are assumed reachable since they can't be
+    checked cheaply.
+
+    Args:
+        timeout: Seconds to wait for the connection.
+
+    Returns:
+        False if the daemon is known to be unreachable, True otherwise.
+    """
+    socket_path = local_docker_socket()
+    if socket_path is None:
+        return True
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(socket_path)
+    except OSError:
+        return False
+    finally:
+        sock.close()
+    return True
+
+
+def dockerfile_build_hash(dockerfile_path: Path) -> Optional[str]:
+    """Hash a Dockerfile whose build does not read the build context.
+
+    Such an image only changes when the Dockerfile does, so an existing
+    image with the same hash can be reused without running docker build.
+
+    Args:
+        dockerfile_path: Path to the Dockerfile.
+
+    Returns:
+        Hex digest of the Dockerfile, or None if it can't be read or its
+        build may read files from the build context.
+    """
+    try:
+        content = dockerfile_path.read_bytes()
+    except OSError:
+        return None
+
+    for words in _dockerfile_instructions(content.decode(errors="replace")):
+        if _reads_build_context(words):
+            return None
+
+    return hashlib.sha256(content).hexdigest()
+
+
+def _dockerfile_instructions(text: str) -> Iterator[list[str]]:
+    """Split a Dockerfile into instructions.
+
+    Lines ending in the escape character (a backslash, or the one set with
+    an escape parser directive) are joined with the next line, and comment
+    lines are skipped, as docker does.
+
+    Args:
+        text: The Dockerfile content.
+
+    Yields:
+        The words of each instruction, e.g. ["COPY", "a", "/b"].
+    """
+    escape = "\\"
+    in_directives = True
+    pending: list[str] = []
+    for line in text.splitlines():
+        stripped = line.strip()
+        if in_directives:
+            # Parser directives ("# escape=`") may only precede everything else
+            key, sep, value = stripped[1:].partition("=")
+            if stripped.startswith("#") and sep and key.strip().isalpha():
+                if key.strip().lower() == "escape":
+                    escape = value.strip() or escape
+                continue
+            in_directives = False
+        if not stripped or stripped.startswith("#"):
+            continue
+        if stripped.endswith(escape):
+            pending.append(stripped[: -len(escape)])
+            continue
+        pending.append(stripped)
+        yield " ".join(pending).split()
+        pending = []
+    if pending:
+        yield " ".join(pending).split()
+
+
+def _reads_build_context(words: list[str]) -> bool:
+    """Check whether a Dockerfile instruction may read the build context.
+
+    Instructions that can't be judged from their words are assumed to read
+    it: ONBUILD triggers and anything with a heredoc (<<EOF).
+
+    Args:
+        words: The instruction's words, see _dockerfile_instructions.
+
+    Returns:
+        True if the instruction may read the build context.
+    """
+    instruction = words[0].upper()
+    args = words[1:]
+    if instruction == "ONBUILD" or any(arg.startswith("<<") for arg in args):
+        return True
+    if instruction in ("COPY", "ADD"):
+        return not any(arg.startswith("--from=") for arg in args)
+    if instruction == "RUN":
+        # Bind mounts (the default mount type) come from the context unless
+        # they name another stage or image
+        for arg in args:
+            if arg.startswith("--mount="):
+                options = dict(
+                    option.partition("=")[::2]
+                    for option in arg[len("--mount=") :].split(",")
+                )
+                if options.get("type", "bind") == "bind" and "from" not in options:
+                    return True
+    return False
+
+
+def parse_ps_ports(ports: str) -> dict[int, int]:
+    """Parse the Ports column of docker ps.
+
+    Args:
+        ports: Ports string, e.g. "0.0.0.0:8001->8000/tcp, [::]:8001->8000/tcp".
+            Consecutive ports may be collapsed into ranges like
+            "0.0.0.0:8000-8001->8000-8001/tcp".
+
+    Returns:
+        Dict mapping container port to host port.
+    """
+    mapping: dict[int, int] = {}
+    for entry in ports.split(","):
+        host, sep, container = entry.strip().partition("->")
+        if not sep:
+            # Exposed but not published (e.g. "8000/tcp")
+            continue
+        host_ports = host.rpartition(":")[2]
+        container_ports = container.partition("/")[0]
+        try:
+            host_start, _, host_end = host_ports.partition("-")
+            container_start, _, container_end = container_ports.partition("-")
+            host_range = range(int(host_start), int(host_end or host_start) + 1)
+            container_range = range(
+                int(container_start), int(container_end or container_start) + 1
+            )
+        except ValueError:
+            continue
+        for container_port, host_port in zip(container_range, host_range):
+            mapping[container_port] = host_port
+    return mapping
+
+
+def docker_api_get(socket_path: str, path: str) -> Optional[Any]:
+    """GET a Docker Engine API endpoint over a unix socket.
+
+    Speaks just enough HTTP/1.0 for the read-only queries DockerClient
+    makes, which keeps http.client (and the ssl and email modules it
+    imports) off the CLI's startup path.
+
+    Args:
+        socket_path: Path to the Docker daemon socket.
+        path: Request path including the query string, e.g. "/containers/json".
+
+    Returns:
+        The decoded JSON body, or None if the request failed.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(DOCKER_API_TIMEOUT)
+    try:
+        sock.connect(socket_path)
+        sock.sendall(f"GET {path} HTTP/1.0\r\nHost: docker\r\n\r\n".encode())
+        chunks = []
+        while chunk := sock.recv(65536):
+            chunks.append(chunk)
+    except OSError:
+        return None
+    finally:
+        sock.close()
+
+    # HTTP/1.0 responses are not chunked; the body runs to end of stream
+    head, sep, body = b"".join(chunks).partition(b"\r\n\r\n")
+    if not sep or head.split(b" ", 2)[1:2] != [b"200"]:
+        return None
+    try:
+        return json.loads(body)
+    except ValueError:
+        return None
+
+
+def parse_inspect_ports(ports: Any) -> dict[int, int]:
+    """Parse a container's NetworkSettings.Ports from docker inspect.
+
+    Args:
+        ports: Dict like {"8000/tcp": [{"HostIp": "0.0.0.0", "HostPort": "8001"}]},
+            with None for unpublished ports.
+
+    Returns:
+        Dict mapping container port to host port, for published ports only.
+    """
+    result: dict[int, int] = {}
+    if not isinstance(ports, dict):
+        return result
+    for container_port, bindings in ports.items():
+        if not bindings:
+            continue
+        try:
+            # The IPv4 binding is listed first; keep it over the IPv6 one
+            result[int(container_port.partition("/")[0])] = int(bindings[0]["HostPort"])
+        except (KeyError, TypeError, ValueError):
+            continue
+    return result
+
+
+def parse_api_ports(ports: Any) -> dict[int, int]:
+    """Parse the Ports list of a Docker Engine API container summary.
+
+    Args:
+        ports: List of {"PrivatePort", "PublicPort", ...} dicts.
+
+    Returns:
+        Dict mapping container port to host port, for published ports only.
+    """
+    result: dict[int, int] = {}
+    if not isinstance(ports, list):
+        return result
+    for port in ports:
+        if isinstance(port, dict) and port.get("PublicPort"):
+            # The IPv4 binding is listed first; keep it over the IPv6 one
+            result.setdefault(port["PrivatePort"], port["PublicPort"])
+    return result
+
+
+def _run_query(cmd: list[str]) -> subprocess.CompletedProcess:
+    """Run a short, non-interactive docker command and capture its stdout.
+
+    stdin is /dev/null so docker never reads from the terminal, and stderr,
+    which callers of these commands don't look at, is discarded rather than
+    read through a second pipe.
+
+    Args:
+        cmd: The command to run.
+
+    Returns:
+        The completed process, with stdout as text.
+    """
+    return subprocess.run(
+        cmd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+
+
+def _read_lines(stream: IO[bytes]) -> Iterator[str]:
+    """Yield the lines of a binary pipe as they arrive.
+
+    The pipe is read with os.read in large chunks, and all complete lines in
+    a chunk are decoded in one go. Invalid UTF-8 is replaced instead of
+    raising, so odd bytes in build output can't abort a build.
+
+    Args:
+        stream: Unbuffered binary pipe, e.g. a Popen stdout with bufsize=0.
+
+    Yields:
+        Lines without the trailing newline.
+    """
+    fd = stream.fileno()
+    pending = b""
+    while chunk := os.read(fd, BUILD_OUTPUT_READ_SIZE):
+        *lines, pending = (pending + chunk).split(b"\n")
+        if lines:
+            yield from b"\n".join(lines).decode(errors="replace").split("\n")
+    if pending:
+        yield pending.decode(errors="replace")
+
+
+def _run_silent(cmd: list[str]) -> int:
+    """Run a docker command whose output is never used.
+
+    All three standard streams go to /dev/null, so no pipes are created and
+    nothing has to be read back before the command is reaped.
+
+    Args:
+        cmd: The command to run.
+
+    Returns:
+        The command's exit status.
+    """
+    return subprocess.run(
+        cmd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    ).returncode
+
+
+def _run_action(
+    cmd: list[str],
+    action: str,
+    spawn: Optional[Callable[..., subprocess.Popen]] = None,
+) -> None:
+    """Run a docker command whose output is only needed when it fails.
+
+    stdout is discarded and stderr is read line by line, keeping only the
+    last ERROR_OUTPUT_LINES lines, so a noisy failure (e.g. a long build log)
+    isn't held in memory in full.
+
+    Args:
+        cmd: The command to run.
+        action: Name used in the error message, e.g. "run".
+        spawn: Starts the process instead of subprocess.Popen, with the same
+            arguments.
+
+    Raises:
+        RuntimeError: If the command exits with a non-zero status.
+    """
+    process = (spawn or subprocess.Popen)(
+        cmd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    error_lines: deque[str] = deque(maxlen=ERROR_OUTPUT_LINES)
+    if process.stderr:
+        with process.stderr:
+            error_lines.extend(process.stderr)
+    process.wait()
+
+    if process.returncode != 0:
+        raise RuntimeError(f"docker {action} failed: {''.join(error_lines)}")
+
+
 class DockerClient:
     """Client for Docker operations with devcontainers."""
 
-    def __init__(self, project_root: Path):
+    def __init__(self, project_root: Path, use_api: bool = False):
         """Initialize DockerClient.
 
         Args:
             project_root: Path to the project root.
+            use_api: Answer container queries (state, ports, listing) through
+                the Docker Engine API when docker uses a local socket, which
+                skips starting the docker CLI. Falls back to the CLI if the
+                API request fails.
+        """
+        self.project_root = (
+            project_root if isinstance(project_root, Path) else Path(project_root)
+        )
+        self.namespace = get_project_namespace(self.project_root)
+        # Shared start of every container and image name in this namespace
+        self._name_prefix = f"sandbox-{self.namespace}-"
+        self._api_socket = local_docker_socket() if use_api else None
+        # (query, container) -> (monotonic time, result)
+        self._metadata_cache: dict[tuple[str, str], tuple[float, Any]] = {}
+        # Running docker build, so another thread can stop it (see cancel_build)
+        self._build_lock = threading.Lock()
+        self._build_process: Optional[subprocess.Popen] = None
+        self._build_cancelled = False
+
+    def _cached(self, query: str, container: str, fetch: Callable[[], Any]) -> Any:
+        """Return a recent result for a per-container query, or fetch it.
+
+        Each docker CLI call costs tens of milliseconds, and a single command
+        often asks about the same container more than once.
+
+        Args:
+            query: Name of the query, e.g. "state".
+            container: The container the query is about.
+            fetch: Runs the docker query.
+
+        Returns:
+            The cached or freshly fetched result.
         """
-        self.project_root = Path(project_root)
-        self.namespace = get_project_namespace(project_root)
+        key = (query, container)
+        now = time.monotonic()
+        entry = self._metadata_cache.get(key)
+        if entry is not None and now - entry[0] < METADATA_CACHE_TTL:
+            return entry[1]
+
+        result = fetch()
+        self._metadata_cache[key] = (now, result)
+        return result
+
+    def clear_cache(self) -> None:
+        """Forget cached container query results.
+
+        Called by every method that starts, stops or removes containers.
+        """
+        self._metadata_cache.clear()
+
+    def _api_containers(
+        self, filters: dict[str, list[str]], all_containers: bool = False
+    ) -> Optional[list[dict]]:
+        """List containers through the Docker Engine API.
+
+        Args:
+            filters: Filters as accepted by docker ps, e.g. {"label": [...]}.
+            all_containers: Include stopped containers.
+
+        Returns:
+            Container summaries from GET /containers/json, or None if the API
+            is not in use or the request failed.
+        """
+        if self._api_socket is None:
+            return None
+
+        from urllib.parse import urlencode
+
+        query = urlencode({"all": int(all_containers), "filters": json.dumps(filters)})
+        containers = docker_api_get(self._api_socket, f"/containers/json?{query}")
+        return containers if isinstance(containers, list) else None
+
+    def _sandbox_api_containers(self, all_namespaces: bool) -> Optional[list[dict]]:
+        """Running sandbox containers from the API (see _sandbox_ps_command)."""
+        labels = [SANDBOX_LABEL]
+        if not all_namespaces:
+            labels.append(f"agent-sandbox.namespace={self.namespace}")
+        return self._api_containers({"label": labels})
 
     def container_name(self, sandbox_name: str) -> str:
         """Get the container name for a sandbox.
@@ -72,8 +566,7 @@ class DockerClient:
         Returns:
             The container name (sanitized for Docker).
         """
-        safe_name = sanitize_docker_name(sandbox_name)
-        return f"sandbox-{self.namespace}-{safe_name}"
+        return self._name_prefix + sanitize_docker_name(sandbox_name)
 
     def image_name(self, sandbox_name: str) -> str:
         """Get the image name for a sandbox.
@@ -84,8 +577,7 @@ class DockerClient:
         Returns:
             The image name (sanitized for Docker).
         """
-        safe_name = sanitize_docker_name(sandbox_name)
-        return f"sandbox-{self.namespace}-{safe_name}:latest"
+        return self._name_prefix + sanitize_docker_name(sandbox_name) + ":latest"
 
     def build_image(
         self,
@@ -93,6 +585,7 @@ class DockerClient:
         context_path: Path,
         dockerfile: str,
         on_output: Optional[OutputCallback] = None,
+        build_hash: Optional[str] = None,
     ) -> None:
         """Build a Docker image from a Dockerfile.
 
@@ -101,9 +594,11 @@ class DockerClient:
             context_path: The build context directory.
             dockerfile: Path to Dockerfile relative to context.
             on_output: Optional callback for build output lines.
+            build_hash: Dockerfile hash to record on the image, see
+                dockerfile_build_hash.
 
         Raises:
-            RuntimeError: If build fails.
+            RuntimeError: If build fails or was cancelled with cancel_build.
         """
         image_name = self.image_name(sandbox_name)
 
@@ -113,37 +608,78 @@ class DockerClient:
             "-t",
             image_name,
             "-f",
-            str(context_path / dockerfile),
-            str(context_path),
+            os.path.join(context_path, dockerfile),
         ]
+        if build_hash:
+            cmd.extend(["--label", f"{BUILD_HASH_LABEL}={build_hash}"])
+        cmd.append(str(context_path))
 
         # Stream output if callback provided
         if on_output:
-            process = subprocess.Popen(
+            # Build output arrives in many small writes; read the raw pipe
+            # so each read picks up whatever has accumulated
+            process = self._spawn_build(
                 cmd,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT,
-                text=True,
+                bufsize=0,
             )
-            output_lines: list[str] = []
+            # Only the tail is reported on failure, so don't keep the rest
+            output_lines: deque[str] = deque(maxlen=ERROR_OUTPUT_LINES)
             if process.stdout:
-                for line in process.stdout:
+                for line in _read_lines(process.stdout):
                     line = line.rstrip()
                     output_lines.append(line)
                     on_output(line)
             process.wait()
             if process.returncode != 0:
-                raise RuntimeError(
-                    "docker build failed:\n" + "\n".join(output_lines[-20:])
-                )
+                raise RuntimeError("docker build failed:\n" + "\n".join(output_lines))
         else:
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-            )
-            if result.returncode != 0:
-                raise RuntimeError(f"docker build failed: {result.stderr}")
+            _run_action(cmd, "build", spawn=self._spawn_build)
+
+    def _spawn_build(self, cmd: list[str], **kwargs: Any) -> subprocess.Popen:
+        """Start a docker build that cancel_build can stop.
+
+        Raises:
+            RuntimeError: If cancel_build was already called.
+        """
+        with self._build_lock:
+            if self._build_cancelled:
+                raise RuntimeError("docker build cancelled")
+            self._build_process = subprocess.Popen(cmd, **kwargs)
+            return self._build_process
+
+    def cancel_build(self) -> None:
+        """Stop a docker build running in another thread.
+
+        The build then fails with RuntimeError. Builds this client would start
+        afterwards are refused, so a build that hasn't started yet won't run.
+        """
+        with self._build_lock:
+            self._build_cancelled = True
+            if self._build_process is not None and self._build_process.poll() is None:
+                self._build_process.terminate()
+
+    def image_is_current(self, sandbox_name: str, build_hash: str) -> bool:
+        """Check whether the sandbox image was built from the same Dockerfile.
+
+        Args:
+            sandbox_name: The sandbox name.
+            build_hash: Hash of the current Dockerfile.
+
+        Returns:
+            True if the image exists and carries the same build hash.
+        """
+        cmd = [
+            "docker",
+            "image",
+            "inspect",
+            "--format",
+            f'{{{{index .Config.Labels "{BUILD_HASH_LABEL}"}}}}',
+            self.image_name(sandbox_name),
+        ]
+        result = _run_query(cmd)
+        return result.returncode == 0 and result.stdout.strip() == build_hash
 
     def run_container(
         self,
@@ -170,6 +706,22 @@ class DockerClient:
             RuntimeError: If run fails.
         """
         container_name = self.container_name(sandbox_name)
+        self.clear_cache()
+
+        # Mount git server if provided
+        git_server_args = (
+            ["-v", f"{git_server_path}:/repo-origin"] if git_server_path else []
+        )
+
+        # Custom mounts and port mappings
+        mount_args = [
+            arg for source, dest in mounts or () for arg in ("-v", f"{source}:{dest}")
+        ]
+        port_args = [
+            arg
+            for container_port, host_port in ports.items()
+            for arg in ("-p", f"{host_port}:{container_port}")
+        ]
 
         cmd = [
             "docker",
@@ -189,35 +741,70 @@ class DockerClient:
             f"{workspace_path}:{workdir}",
             "-w",
             workdir,
+            *git_server_args,
+            *mount_args,
+            *port_args,
+            image,
+            # Keep container running with sleep infinity
+            "sleep",
+            "infinity",
         ]
 
-        # Mount git server if provided
-        if git_server_path:
-            cmd.extend(["-v", f"{git_server_path}:/repo-origin"])
+        _run_action(cmd, "run")
 
-        # Add custom mounts
-        if mounts:
-            for source, dest in mounts:
-                cmd.extend(["-v", f"{source}:{dest}"])
+    def prepare_image(
+        self,
+        sandbox_name: str,
+        context_path: Path,
+        dockerfile: str,
+        image: str | None,
+        on_progress: Optional[ProgressCallback] = None,
+        on_build_output: Optional[OutputCallback] = None,
+    ) -> str:
+        """Build the sandbox image if needed and return the image to run.
 
-        # Add port mappings
-        for container_port, host_port in ports.items():
-            cmd.extend(["-p", f"{host_port}:{container_port}"])
+        Args:
+            sandbox_name: The sandbox name.
+            context_path: Build context path (if building).
+            dockerfile: Dockerfile path relative to context (if building).
+            image: Base image name (if not building).
+            on_progress: Optional callback for progress updates.
+            on_build_output: Optional callback for build output lines.
 
-        # Add the image
-        cmd.append(image)
+        Returns:
+            The image to run the sandbox container from.
 
-        # Keep container running with sleep infinity
-        cmd.extend(["sleep", "infinity"])
+        Raises:
+            RuntimeError: If the build fails or no image is configured.
+        """
 
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-        )
+        def progress(msg: str) -> None:
+            if on_progress:
+                on_progress(msg)
 
-        if result.returncode != 0:
-            raise RuntimeError(f"docker run failed: {result.stderr}")
+        if dockerfile:
+            # Build from Dockerfile, unless an image built from the same
+            # Dockerfile is still around (e.g. after rm)
+            build_hash = dockerfile_build_hash(context_path / dockerfile)
+            if build_hash and self.image_is_current(sandbox_name, build_hash):
+                progress("Using existing container image...")
+            else:
+                progress("Building container image...")
+                self.build_image(
+                    sandbox_name,
+                    context_path,
+                    dockerfile,
+                    on_output=on_build_output,
+                    build_hash=build_hash,
+                )
+            return self.image_name(sandbox_name)
+
+        if image:
+            # Use specified image
+            progress(f"Using image {image}...")
+            return image
+
+        raise RuntimeError("No Dockerfile or image specified in devcontainer.json")
 
     def start_container(
         self,
@@ -232,6 +819,8 @@ class DockerClient:
         mounts: Optional[list[tuple[str, str]]] = None,
         on_progress: Optional[ProgressCallback] = None,
         on_build_output: Optional[OutputCallback] = None,
+        container_state: Optional[ContainerState] = None,
+        run_image: Optional[str] = None,
     ) -> None:
         """Build (if needed) and start a container for a sandbox.
 
@@ -250,6 +839,10 @@ class DockerClient:
             mounts: List of (source, dest) tuples for additional bind mounts.
             on_progress: Optional callback for progress updates.
             on_build_output: Optional callback for build output lines.
+            container_state: Already known container state. Queried from
+                Docker if not provided.
+            run_image: Image already returned by prepare_image, so no
+                build is needed.
 
         Raises:
             RuntimeError: If build or run fails.
@@ -260,7 +853,8 @@ class DockerClient:
                 on_progress(msg)
 
         # Check if container already exists
-        container_state = self.get_container_state(sandbox_name)
+        if container_state is None:
+            container_state = self.get_container_state(sandbox_name)
 
         if container_state == ContainerState.RUNNING:
             # Already running, nothing to do
@@ -273,21 +867,16 @@ class DockerClient:
             self.restart_container(sandbox_name)
             return
 
-        # Container doesn't exist - build and run
-        # Determine which image to use
-        if dockerfile:
-            # Build from Dockerfile
-            progress("Building container image...")
-            self.build_image(
-                sandbox_name, context_path, dockerfile, on_output=on_build_output
+        # Container doesn't exist - build (unless already done) and run
+        if run_image is None:
+            run_image = self.prepare_image(
+                sandbox_name,
+                context_path,
+                dockerfile,
+                image,
+                on_progress=on_progress,
+                on_build_output=on_build_output,
             )
-            run_image = self.image_name(sandbox_name)
-        elif image:
-            # Use specified image
-            progress(f"Using image {image}...")
-            run_image = image
-        else:
-            raise RuntimeError("No Dockerfile or image specified in devcontainer.json")
 
         # Run the container
         progress("Starting container...")
@@ -308,8 +897,45 @@ class DockerClient:
             sandbox_name: The sandbox name.
         """
         container_name = self.container_name(sandbox_name)
-        cmd = ["docker", "stop", container_name]
-        subprocess.run(cmd, capture_output=True)
+        self.clear_cache()
+        cmd = ["docker", "stop", "--time", str(STOP_TIMEOUT), container_name]
+        _run_silent(cmd)
+
+    def stop_containers(self, container_names: list[str]) -> Iterator[str]:
+        """Stop several containers with a single docker invocation.
+
+        docker stops the containers concurrently and prints each name once
+        it has stopped, so names are yielded as they are reported.
+
+        Args:
+            container_names: Full container names to stop.
+
+        Yields:
+            Names of containers that were stopped.
+        """
+        if not container_names:
+            return
+
+        self.clear_cache()
+        cmd = ["docker", "stop", "--time", str(STOP_TIMEOUT), *container_names]
+        process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+        try:
+            if process.stdout:
+                for line in process.stdout:
+                    line = line.strip()
+                    if line:
+                        yield line
+        finally:
+            # Runs even if the caller stops iterating early. The rest of the
+            # output is drained rather than the pipe closed, so docker can
+            # finish stopping the remaining containers before it is reaped.
+            process.communicate()
 
     def restart_container(self, sandbox_name: str) -> None:
         """Start a stopped container.
@@ -321,11 +947,9 @@ class DockerClient:
             RuntimeError: If the container fails to start.
         """
         container_name = self.container_name(sandbox_name)
+        self.clear_cache()
         cmd = ["docker", "start", container_name]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-
-        if result.returncode != 0:
-            raise RuntimeError(f"docker start failed: {result.stderr}")
+        _run_action(cmd, "start")
 
     def remove_container(self, sandbox_name: str) -> None:
         """Remove a sandbox container.
@@ -334,8 +958,9 @@ class DockerClient:
             sandbox_name: The sandbox name.
         """
         container_name = self.container_name(sandbox_name)
+        self.clear_cache()
         cmd = ["docker", "rm", "-f", container_name]
-        subprocess.run(cmd, capture_output=True)
+        _run_silent(cmd)
 
     def container_exists(self, sandbox_name: str) -> bool:
         """Check if a sandbox container exists and is running.
@@ -358,44 +983,128 @@ class DockerClient:
             ContainerState indicating if container is running, stopped, or not found.
         """
         container_name = self.container_name(sandbox_name)
+        return self._cached(
+            "state", container_name, lambda: self._query_state(container_name)
+        )
 
-        # Check all containers (including stopped ones)
-        cmd = [
-            "docker",
-            "ps",
-            "-a",
-            "--filter",
-            f"name=^{container_name}$",
-            "--format",
-            "{{.Names}}\t{{.State}}",
-        ]
+    def get_container_states(
+        self, sandbox_names: list[str]
+    ) -> dict[str, ContainerState]:
+        """Get the states of several sandbox containers with one docker query.
 
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        Batched form of get_container_state. The results are also cached for
+        later get_container_state calls.
 
-        if result.returncode != 0 or not result.stdout.strip():
-            return ContainerState.NOT_FOUND
+        Args:
+            sandbox_names: The sandbox names.
 
-        # Parse output: "container_name\tstate"
-        for line in result.stdout.strip().split("\n"):
-            parts = line.split("\t")
-            if len(parts) >= 2 and parts[0] == container_name:
-                state = parts[1].lower()
-                if state == "running":
-                    return ContainerState.RUNNING
-                else:
-                    # Any other state (exited, created, paused, etc.) is "stopped"
-                    return ContainerState.STOPPED
+        Returns:
+            Dict mapping each sandbox name to its ContainerState.
+        """
+        container_names = {self.container_name(name): name for name in sandbox_names}
+        states = self._refresh_containers(list(container_names))
+        return {container_names[c]: state for c, state in states.items()}
 
-        return ContainerState.NOT_FOUND
+    def _query_state(self, container_name: str) -> ContainerState:
+        """Ask docker for a container's state (uncached get_container_state)."""
+        return self._refresh_containers([container_name])[container_name]
 
-    def list_sandbox_containers(self, all_namespaces: bool = False) -> list[str]:
-        """List all running sandbox containers.
+    def _refresh_containers(
+        self, container_names: list[str]
+    ) -> dict[str, ContainerState]:
+        """Query containers and cache their states and sandbox names.
 
         Args:
-            all_namespaces: If False, only return containers from this namespace.
+            container_names: The container names.
 
         Returns:
-            List of container names.
+            Dict mapping each container name to its ContainerState.
+        """
+        containers = self._query_containers(container_names)
+
+        now = time.monotonic()
+        states = {}
+        for container_name, (state, label) in containers.items():
+            sandbox_name = label or extract_sandbox_name(container_name)
+            self._metadata_cache[("state", container_name)] = (now, state)
+            self._metadata_cache[("name", container_name)] = (now, sandbox_name)
+            states[container_name] = state
+        return states
+
+    def _query_containers(
+        self, container_names: list[str]
+    ) -> dict[str, tuple[ContainerState, str]]:
+        """Ask docker for the states and name labels of containers (uncached).
+
+        Args:
+            container_names: The container names.
+
+        Returns:
+            Dict mapping each container name to its ContainerState and
+            agent-sandbox.name label ("" if missing).
+        """
+        containers = dict.fromkeys(container_names, (ContainerState.NOT_FOUND, ""))
+        if not container_names:
+            return containers
+
+        # Name filters are OR-ed, so one query covers every container
+        name_filters = [f"^{name}$" for name in container_names]
+
+        summaries = self._api_containers({"name": name_filters}, all_containers=True)
+        if summaries is not None:
+            rows = [
+                (
+                    c["Names"][0].lstrip("/"),
+                    c.get("State", ""),
+                    (c.get("Labels") or {}).get("agent-sandbox.name", ""),
+                )
+                for c in summaries
+                if c.get("Names")
+            ]
+        else:
+            # Check all containers (including stopped ones)
+            cmd = ["docker", "ps", "-a"]
+            for name_filter in name_filters:
+                cmd.extend(["--filter", f"name={name_filter}"])
+            cmd.extend(
+                ["--format", '{{.Names}}\t{{.State}}\t{{.Label "agent-sandbox.name"}}']
+            )
+
+            result = _run_query(cmd)
+            if result.returncode != 0:
+                return containers
+
+            # Parse output: "container_name\tstate\tsandbox_name"
+            rows = []
+            for line in result.stdout.splitlines():
+                parts = line.split("\t")
+                if len(parts) >= 2:
+                    rows.append(
+                        (parts[0], parts[1], parts[2] if len(parts) > 2 else "")
+                    )
+
+        for name, state, label in rows:
+            if name in containers:
+                # Any state other than running (exited, created, paused, etc.)
+                # is "stopped"
+                containers[name] = (
+                    ContainerState.RUNNING
+                    if state.lower() == "running"
+                    else ContainerState.STOPPED,
+                    label.strip(),
+                )
+
+        return containers
+
+    def _sandbox_ps_command(self, fmt: str, all_namespaces: bool) -> list[str]:
+        """Build a docker ps command listing running sandbox containers.
+
+        Args:
+            fmt: Go template passed to --format.
+            all_namespaces: If False, only match containers from this namespace.
+
+        Returns:
+            The docker ps command.
         """
         cmd = [
             "docker",
@@ -403,7 +1112,7 @@ class DockerClient:
             "--filter",
             f"label={SANDBOX_LABEL}",
             "--format",
-            "{{.Names}}",
+            fmt,
         ]
 
         if not all_namespaces:
@@ -414,13 +1123,101 @@ class DockerClient:
                 ]
             )
 
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        return cmd
+
+    def list_sandbox_containers(self, all_namespaces: bool = False) -> list[str]:
+        """List all running sandbox containers.
+
+        Args:
+            all_namespaces: If False, only return containers from this namespace.
+
+        Returns:
+            List of container names.
+        """
+        # Same single query as list_sandbox_container_info
+        return [
+            c.container_name
+            for c in self.list_sandbox_container_info(all_namespaces=all_namespaces)
+        ]
+
+    def list_sandbox_container_info(
+        self, all_namespaces: bool = False
+    ) -> list[SandboxContainer]:
+        """List running sandbox containers with their sandbox names and ports.
+
+        Everything is read from a single docker ps call rather than an
+        inspect and a docker port per container. The states, sandbox names
+        and ports found are also cached for the per-container queries.
+
+        Args:
+            all_namespaces: If False, only return containers from this namespace.
+
+        Returns:
+            List of SandboxContainer, in docker ps order.
+        """
+        containers = self._list_sandbox_container_info(all_namespaces)
+
+        now = time.monotonic()
+        for c in containers:
+            self._metadata_cache[("state", c.container_name)] = (
+                now,
+                ContainerState.RUNNING,
+            )
+            self._metadata_cache[("name", c.container_name)] = (now, c.sandbox_name)
+            # Copy so callers can't modify the cached mapping
+            self._metadata_cache[("ports", c.container_name)] = (now, dict(c.ports))
+
+        return containers
+
+    def _list_sandbox_container_info(
+        self, all_namespaces: bool
+    ) -> list[SandboxContainer]:
+        """List running sandbox containers (uncached list_sandbox_container_info)."""
+        api_containers = self._sandbox_api_containers(all_namespaces)
+        if api_containers is not None:
+            containers = []
+            for c in api_containers:
+                if not c.get("Names"):
+                    continue
+                container_name = c["Names"][0].lstrip("/")
+                labels = c.get("Labels") or {}
+                containers.append(
+                    SandboxContainer(
+                        container_name=container_name,
+                        sandbox_name=labels.get("agent-sandbox.name")
+                        or extract_sandbox_name(container_name),
+                        ports=parse_api_ports(c.get("Ports")),
+                    )
+                )
+            return containers
+
+        cmd = self._sandbox_ps_command(
+            '{{.Names}}\t{{.Label "agent-sandbox.name"}}\t{{.Ports}}',
+            all_namespaces,
+        )
+
+        result = _run_query(cmd)
 
         if result.returncode != 0:
             return []
 
-        containers = result.stdout.strip().split("\n")
-        return [c for c in containers if c]
+        containers = []
+        for line in result.stdout.splitlines():
+            parts = line.split("\t")
+            if not parts[0]:
+                continue
+            container_name = parts[0]
+            sandbox_name = parts[1] if len(parts) > 1 else ""
+            ports = parse_ps_ports(parts[2]) if len(parts) > 2 else {}
+            containers.append(
+                SandboxContainer(
+                    container_name=container_name,
+                    sandbox_name=sandbox_name or extract_sandbox_name(container_name),
+                    ports=ports,
+                )
+            )
+
+        return containers
 
     def get_container_ports(self, sandbox_name: str) -> dict[int, int]:
         """Get port mappings for a sandbox container.
@@ -432,26 +1229,33 @@ class DockerClient:
             Dict mapping container port to host port.
         """
         container_name = self.container_name(sandbox_name)
-        cmd = ["docker", "port", container_name]
+        ports = self._cached(
+            "ports", container_name, lambda: self._query_ports(container_name)
+        )
+        # Copy so callers can't modify the cached mapping
+        return dict(ports)
 
-        result = subprocess.run(cmd, capture_output=True, text=True)
+    def _query_ports(self, container_name: str) -> dict[int, int]:
+        """Ask docker for a container's ports (uncached get_container_ports)."""
+        containers = self._api_containers({"name": [f"^{container_name}$"]})
+        if containers is not None:
+            return parse_api_ports(containers[0].get("Ports")) if containers else {}
 
+        cmd = [
+            "docker",
+            "inspect",
+            "--format",
+            "{{json .NetworkSettings.Ports}}",
+            container_name,
+        ]
+        result = _run_query(cmd)
         if result.returncode != 0:
             return {}
 
-        ports = {}
-        for line in result.stdout.strip().split("\n"):
-            if not line:
-                continue
-
-            # Format: "8000/tcp -> 0.0.0.0:8001"
-            match = re.match(r"(\d+)/\w+ -> [\d.]+:(\d+)", line)
-            if match:
-                container_port = int(match.group(1))
-                host_port = int(match.group(2))
-                ports[container_port] = host_port
-
-        return ports
+        try:
+            return parse_inspect_ports(json.loads(result.stdout))
+        except ValueError:
+            return {}
 
     def get_sandbox_name_from_container(self, container_name: str) -> str:
         """Extract sandbox name from container name.
@@ -465,24 +1269,25 @@ class DockerClient:
         Returns:
             The sandbox name.
         """
-        # Try to get the name from the label first (most reliable)
-        cmd = [
-            "docker",
-            "inspect",
-            "--format",
-            '{{index .Config.Labels "agent-sandbox.name"}}',
+        return self._cached(
+            "name",
             container_name,
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode == 0 and result.stdout.strip():
-            return result.stdout.strip()
+            lambda: self._query_sandbox_name(container_name),
+        )
 
-        # Fall back to parsing container name
-        return extract_sandbox_name(container_name)
+    def _query_sandbox_name(self, container_name: str) -> str:
+        """Read a container's sandbox name label (uncached)."""
+        # The label comes from the same docker ps as the state, which caches
+        # the name (falling back to parsing the container name)
+        self._refresh_containers([container_name])
+        return self._metadata_cache[("name", container_name)][1]
 
     def show_logs(self, sandbox_name: str, follow: bool = True) -> None:
         """Show logs for a sandbox container.
 
+        docker writes directly to the inherited stdout/stderr, so logs are
+        streamed as they arrive and never buffered in this process.
+
         Args:
             sandbox_name: The sandbox name.
             follow: Whether to follow logs.
@@ -494,7 +1299,7 @@ class DockerClient:
             cmd.append("-f")
         cmd.append(container_name)
 
-        # Run interactively
+        # Run interactively (no capture, output goes straight to the terminal)
         subprocess.run(cmd)
 
     def shell_exists(self, sandbox_name: str, shell: str) -> bool:
@@ -510,31 +1315,33 @@ class DockerClient:
         container_name = self.container_name(sandbox_name)
         cmd = ["docker", "exec", container_name, "test", "-x", shell]
 
-        result = subprocess.run(cmd, capture_output=True)
+        result = _run_query(cmd)
         return result.returncode == 0
 
-    def exec_shell(self, sandbox_name: str, shell: str = "sh") -> None:
+    def exec_shell(self, sandbox_name: str, shell: str = "sh") -> int:
         """Execute an interactive shell in a sandbox container.
 
         Args:
             sandbox_name: The sandbox name.
             shell: The shell to use (default: sh).
 
+        Returns:
+            The exit status of the shell.
+
         Raises:
             RuntimeError: If shell doesn't exist in container.
         """
-        # Check if shell exists first
-        if not self.shell_exists(sandbox_name, shell):
-            raise RuntimeError(
-                f"Shell '{shell}' not found in container. "
-                f"Please add it to your .devcontainer/Dockerfile and rebuild the sandbox:\n"
-                f"  1. Add '{shell.split('/')[-1]}' to apt-get install in Dockerfile\n"
-                f"  2. Run: agent-sandbox rm {sandbox_name}\n"
-                f"  3. Run: agent-sandbox connect {sandbox_name}"
-            )
-
         container_name = self.container_name(sandbox_name)
 
+        # The shell check runs in the same docker exec as the shell itself,
+        # rather than a separate docker exec beforehand. The shell is passed
+        # as an argument so it needs no quoting, and is shifted off so init
+        # commands don't see it as $1.
+        script = (
+            '_agent_sandbox_shell="$1"; shift; '
+            'if [ ! -x "$_agent_sandbox_shell" ]; then exit 127; fi; '
+        )
+
         # Check for shell init commands from config
         init_commands = get_shell_init()
 
@@ -542,17 +1349,36 @@ class DockerClient:
             # Run init commands then exec into the shell
             # Join commands with && and then exec the shell
             init_script = " && ".join(init_commands)
-            cmd = [
-                "docker",
-                "exec",
-                "-it",
-                container_name,
-                "bash",
-                "-c",
-                f"{init_script} && exec {shell}",
-            ]
+            runner = "bash"
+            script += f'{init_script} && exec "$_agent_sandbox_shell"'
         else:
-            cmd = ["docker", "exec", "-it", container_name, shell]
+            runner = "sh"
+            script += 'exec "$_agent_sandbox_shell"'
+
+        cmd = [
+            "docker",
+            "exec",
+            "-it",
+            container_name,
+            runner,
+            "-c",
+            script,
+            runner,
+            shell,
+        ]
+
+        # Run interactively (no capture, the shell uses the terminal)
+        result = subprocess.run(cmd)
+
+        # 127 is also what an interactive session returns after a command
+        # that wasn't found, so only then check whether the shell is missing
+        if result.returncode == 127 and not self.shell_exists(sandbox_name, shell):
+            raise RuntimeError(
+                f"Shell '{shell}' not found in container. "
+                f"Please add it to your .devcontainer/Dockerfile and rebuild the sandbox:\n"
+                f"  1. Add '{os.path.basename(shell)}' to apt-get install in Dockerfile\n"
+                f"  2. Run: agent-sandbox rm {sandbox_name}\n"
+                f"  3. Run: agent-sandbox connect {sandbox_name}"
+            )
 
-        # Run interactively (replace current process)
-        os.execvp("docker", cmd)
+        return result.returncode
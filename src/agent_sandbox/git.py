@@ -2,10 +2,11 @@
 
 import shutil
 import subprocess
+from functools import cached_property
 from pathlib import Path
 from typing import Optional
 
-from .config import get_git_email, get_git_name
+from .config import get_git_email, get_git_name, load_config
 
 # Fixed path inside containers where the git server (bare repo) is mounted
 CONTAINER_GIT_SERVER = "/repo-origin"
@@ -20,14 +21,19 @@ class GitClient:
         Args:
             project_root: The project root directory (must be a git repo).
         """
-        self.project_root = Path(project_root)
+        self.project_root = (
+            project_root if isinstance(project_root, Path) else Path(project_root)
+        )
+        # Set when ensure_git_server has just cloned the server, which then
+        # already has every branch, so the next sync can be skipped
+        self._server_fresh = False
 
-    @property
+    @cached_property
     def git_server_path(self) -> Path:
         """Get the path to the bare repo (git server)."""
         return self.project_root / ".git-server"
 
-    @property
+    @cached_property
     def sandboxes_dir(self) -> Path:
         """Get the directory where sandbox clones are stored."""
         return self.project_root / ".sandboxes"
@@ -57,24 +63,90 @@ class GitClient:
             ["git", "clone", "--bare", ".", str(self.git_server_path)],
             cwd=self.project_root,
             check=True,
-            capture_output=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
         )
+        self._server_fresh = True
+
+    def _git_server_head(self) -> Optional[str]:
+        """Get the branch the git server's HEAD points to.
+
+        This is the branch new sandbox clones check out and branch from.
+
+        Returns:
+            Full ref name, e.g. "refs/heads/main", or None if HEAD can't be
+            read or is detached.
+        """
+        try:
+            head = (self.git_server_path / "HEAD").read_text().strip()
+        except OSError:
+            return None
+
+        ref = head.removeprefix("ref: ")
+        return ref if ref != head and ref.startswith("refs/heads/") else None
 
-    def sync_to_git_server(self) -> None:
-        """Push current branch to the git server.
+    def sync_to_git_server(self, branch: Optional[str] = None) -> None:
+        """Push the branch sandboxes are created from to the git server.
 
         This ensures the git server has the latest commits from main repo
         before creating a new sandbox. Uses --force to handle amended commits.
+        Skipped once right after ensure_git_server creates the server, since
+        the bare clone already has every branch.
+
+        Args:
+            branch: Optional branch the sandbox was asked for. If it exists in
+                the main repo, it is pushed as well.
+
+        Raises:
+            RuntimeError: If the push fails.
         """
+        if self._server_fresh:
+            self._server_fresh = False
+            return
+
         if not self.git_server_path.exists():
             return
 
-        # Push all branches to the git server (force to handle amended commits)
-        subprocess.run(
-            ["git", "push", str(self.git_server_path), "--all", "--force"],
+        # Push only the branch new sandboxes clone (force to handle amended
+        # commits), rather than --all. That also leaves sandbox/* branches
+        # pushed from sandboxes alone.
+        head = self._git_server_head()
+        refspec = [f"{head}:{head}"] if head else ["--all"]
+
+        # Plus the requested branch, which --all used to cover
+        if head and branch and self._local_branch_exists(branch):
+            ref = f"refs/heads/{branch}"
+            if ref != head:
+                refspec.append(f"{ref}:{ref}")
+
+        result = subprocess.run(
+            ["git", "push", str(self.git_server_path), *refspec, "--force"],
             cwd=self.project_root,
-            capture_output=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
         )
+        if result.returncode != 0:
+            raise RuntimeError(
+                f"git push to git server failed: {result.stderr.strip()}"
+            )
+
+    def _local_branch_exists(self, branch: str) -> bool:
+        """Check if a branch exists in the main repo.
+
+        Args:
+            branch: The branch name.
+
+        Returns:
+            True if refs/heads/<branch> exists, False otherwise.
+        """
+        result = subprocess.run(
+            ["git", "rev-parse", "--verify", "--quiet", f"refs/heads/{branch}"],
+            cwd=self.project_root,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        return result.returncode == 0
 
     def create_sandbox(self, name: str, branch: Optional[str] = None) -> Path:
         """Create a sandbox by cloning from the git server.
@@ -94,17 +166,36 @@ class GitClient:
 
         # Ensure git server exists and is up to date
         self.ensure_git_server()
-        self.sync_to_git_server()
+        self.sync_to_git_server(branch)
 
         # Create sandboxes directory
         self.sandboxes_dir.mkdir(parents=True, exist_ok=True)
 
+        # Configure push.default=current so `git push` creates the branch on
+        # remote, plus the git user if provided in config. clone writes -c
+        # settings to the new repo, so no separate git config runs are needed.
+        clone_config = ["push.default=current"]
+        config = load_config()
+        git_name = get_git_name(config)
+        if git_name:
+            clone_config.append(f"user.name={git_name}")
+        git_email = get_git_email(config)
+        if git_email:
+            clone_config.append(f"user.email={git_email}")
+
         # Clone from the git server
         subprocess.run(
-            ["git", "clone", str(self.git_server_path), str(sandbox_path)],
+            [
+                "git",
+                "clone",
+                *[arg for setting in clone_config for arg in ("-c", setting)],
+                str(self.git_server_path),
+                str(sandbox_path),
+            ],
             cwd=self.project_root,
             check=True,
-            capture_output=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
         )
 
         # Determine branch name
@@ -116,15 +207,8 @@ class GitClient:
             ["git", "checkout", "-b", branch],
             cwd=sandbox_path,
             check=True,
-            capture_output=True,
-        )
-
-        # Configure push.default=current so `git push` creates the branch on remote
-        subprocess.run(
-            ["git", "config", "push.default", "current"],
-            cwd=sandbox_path,
-            check=True,
-            capture_output=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
         )
 
         # Configure the clone to use container path for origin
@@ -133,7 +217,8 @@ class GitClient:
             ["git", "remote", "set-url", "origin", CONTAINER_GIT_SERVER],
             cwd=sandbox_path,
             check=True,
-            capture_output=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
         )
 
         # Copy AGENTS.md from .devcontainer if it exists
@@ -144,25 +229,6 @@ class GitClient:
             if not sandbox_agents.exists():
                 shutil.copy(devcontainer_agents, sandbox_agents)
 
-        # Set git user configuration if provided in config
-        git_name = get_git_name()
-        if git_name:
-            subprocess.run(
-                ["git", "config", "user.name", git_name],
-                cwd=sandbox_path,
-                check=True,
-                capture_output=True,
-            )
-
-        git_email = get_git_email()
-        if git_email:
-            subprocess.run(
-                ["git", "config", "user.email", git_email],
-                cwd=sandbox_path,
-                check=True,
-                capture_output=True,
-            )
-
         return sandbox_path
 
     def remove_sandbox(self, name: str) -> None:
@@ -185,19 +251,26 @@ class GitClient:
         Returns:
             Branch name, or "detached" if not on a branch.
         """
-        sandbox_path = self.sandbox_path(name)
-
-        result = subprocess.run(
-            ["git", "branch", "--show-current"],
-            cwd=sandbox_path,
-            capture_output=True,
-            text=True,
-        )
-
-        if result.returncode != 0 or not result.stdout.strip():
+        # HEAD is a one-line file ("ref: refs/heads/<branch>" on a branch), so
+        # read it rather than starting git for each sandbox
+        git_dir = self.sandbox_path(name) / ".git"
+        try:
+            head = (git_dir / "HEAD").read_text()
+        except NotADirectoryError:
+            # .git is a "gitdir: <path>" file pointing at the real git dir
+            try:
+                pointer = git_dir.read_text().strip()
+                real_git_dir = git_dir.parent / pointer.removeprefix("gitdir: ")
+                head = (real_git_dir / "HEAD").read_text()
+            except OSError:
+                return "detached"
+        except OSError:
             return "detached"
 
-        return result.stdout.strip()
+        ref = head.strip().removeprefix("ref: refs/heads/")
+        if ref == head.strip() or not ref:
+            return "detached"
+        return ref
 
     def merge_sandbox(self, name: str) -> tuple[bool, str]:
         """Merge a sandbox's changes into the current branch.
@@ -221,7 +294,8 @@ class GitClient:
         result = subprocess.run(
             ["git", "fetch", str(self.git_server_path), branch],
             cwd=self.project_root,
-            capture_output=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
             text=True,
         )
 
@@ -232,22 +306,15 @@ class GitClient:
         result = subprocess.run(
             ["git", "merge", "FETCH_HEAD", "-m", f"Merge {branch}"],
             cwd=self.project_root,
-            capture_output=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
             text=True,
         )
 
         if result.returncode == 0:
             return True, f"Successfully merged '{branch}'"
 
-        # Check if there are conflicts
-        status_result = subprocess.run(
-            ["git", "status", "--porcelain"],
-            cwd=self.project_root,
-            capture_output=True,
-            text=True,
-        )
-
-        if "UU" in status_result.stdout or "AA" in status_result.stdout:
+        if self._merge_has_conflicts():
             return False, (
                 f"Merge conflicts detected. Please resolve conflicts in:\n"
                 f"{self.project_root}\n"
@@ -256,6 +323,30 @@ class GitClient:
 
         return False, f"Merge failed: {result.stderr}"
 
+    def _merge_has_conflicts(self) -> bool:
+        """Check whether a failed merge in the project stopped on conflicts.
+
+        A merge stopped by conflicts leaves MERGE_HEAD in the git dir, while
+        one refused outright (e.g. local changes would be overwritten) does
+        not, so this is a file check rather than a git status run. Falls back
+        to git status when .git isn't a directory (worktrees, submodules).
+
+        Returns:
+            True if the merge is waiting for conflicts to be resolved.
+        """
+        git_dir = self.project_root / ".git"
+        if git_dir.is_dir():
+            return (git_dir / "MERGE_HEAD").exists()
+
+        status_result = subprocess.run(
+            ["git", "status", "--porcelain"],
+            cwd=self.project_root,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+        return "UU" in status_result.stdout or "AA" in status_result.stdout
+
     def branch_exists_in_git_server(self, branch: str) -> bool:
         """Check if a branch exists in the git server.
 
@@ -265,12 +356,30 @@ class GitClient:
         Returns:
             True if branch exists, False otherwise.
         """
-        if not self.git_server_path.exists():
+        server = self.git_server_path
+        if not server.exists():
             return False
 
-        result = subprocess.run(
-            ["git", "show-ref", "--verify", "--quiet", f"refs/heads/{branch}"],
-            cwd=self.git_server_path,
-            capture_output=True,
-        )
-        return result.returncode == 0
+        ref = f"refs/heads/{branch}"
+
+        # Refs are plain files in the bare repo, so look for them directly
+        # rather than starting git. The reftable format has no such files.
+        if (server / "reftable").exists():
+            result = subprocess.run(
+                ["git", "show-ref", "--verify", "--quiet", ref],
+                cwd=server,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            return result.returncode == 0
+
+        # A ref is either a loose file under refs/heads/...
+        if (server / ref).is_file():
+            return True
+
+        # ...or a "<sha> <ref>" line in packed-refs
+        try:
+            with open(server / "packed-refs") as f:
+                return any(line.rstrip("\n").endswith(f" {ref}") for line in f)
+        except OSError:
+            return False
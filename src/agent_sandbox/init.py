@@ -1,9 +1,12 @@
 """Initialize devcontainer configuration for agent-sandbox."""
 
 import subprocess
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 
+from .utils import clear_project_root_cache
+
 # Default Dockerfile for agent sandboxes
 # Includes common tools needed for Claude Code and OpenCode
 DEFAULT_DOCKERFILE = """FROM ubuntu:24.04
@@ -126,8 +129,12 @@ def find_git_root(start_path: Optional[Path] = None) -> Optional[Path]:
     if start_path is None:
         start_path = Path.cwd()
 
-    start_path = Path(start_path).resolve()
+    return _find_git_root(Path(start_path).resolve())
+
 
+@lru_cache(maxsize=32)
+def _find_git_root(start_path: Path) -> Optional[Path]:
+    """Run git rev-parse for a resolved path, memoized for the process lifetime."""
     result = subprocess.run(
         ["git", "rev-parse", "--show-toplevel"],
         cwd=start_path,
@@ -141,15 +148,27 @@ def find_git_root(start_path: Optional[Path] = None) -> Optional[Path]:
     return Path(result.stdout.strip())
 
 
+def clear_git_root_cache() -> None:
+    """Forget memoized find_git_root results.
+
+    Results live for the whole process, so call this after running
+    git init in a directory that was already looked up.
+    """
+    _find_git_root.cache_clear()
+
+
 def create_devcontainer(
     project_root: Path,
     project_name: Optional[str] = None,
-) -> None:
+) -> Path:
     """Create a devcontainer configuration for agent-sandbox.
 
     Args:
         project_root: Root directory of the project.
         project_name: Name for the project (default: directory name).
+
+    Returns:
+        Path to the created devcontainer.json.
     """
     if project_name is None:
         project_name = project_root.name
@@ -171,3 +190,8 @@ def create_devcontainer(
     # Create AGENTS.md with sandbox instructions
     agents_md_path = devcontainer_dir / "AGENTS.md"
     agents_md_path.write_text(SANDBOX_AGENTS_MD.strip() + "\n")
+
+    # The project root may have been looked up (and not found) before
+    clear_project_root_cache()
+
+    return devcontainer_json_path
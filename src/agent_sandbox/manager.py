@@ -1,10 +1,12 @@
 """Sandbox manager - main orchestrator for agent-sandbox."""
 
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import cached_property
 from pathlib import Path
-from typing import Callable, Optional
+from typing import Callable, Iterator, Optional
 
-from .docker import DockerClient
+from .docker import ContainerState, DockerClient
 from .git import GitClient
 from .config import get_default_shell, get_mounts
 from .utils import (
@@ -23,7 +25,7 @@ ProgressCallback = Callable[[str], None]
 OutputCallback = Callable[[str], None]
 
 
-@dataclass
+@dataclass(slots=True)
 class SandboxInfo:
     """Information about a sandbox."""
 
@@ -31,35 +33,56 @@ class SandboxInfo:
     branch: str
     ports: dict[int, int]  # container_port -> host_port
     sandbox_path: Path
+    # "container:host" pairs sorted by container port, e.g. "5173:5174, 8000:8001"
+    ports_str: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self.ports_str = ", ".join(map("%s:%s".__mod__, sorted(self.ports.items())))
 
 
 class SandboxManager:
     """Manager for sandbox lifecycle operations using devcontainers."""
 
-    def __init__(self, path: Optional[Path] = None):
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        devcontainer_file: Optional[Path] = None,
+    ):
         """Initialize SandboxManager.
 
         Args:
             path: Path to start searching for project root.
                   If None, uses current directory.
+            devcontainer_file: Known devcontainer.json path. Skips the
+                  project root search when provided.
 
         Raises:
             ValueError: If no project root (devcontainer.json) found.
         """
-        if path is None:
-            path = Path.cwd()
-
-        # Find project root
-        self.project_root = find_project_root(path)
-        if self.project_root is None:
-            raise ValueError(
-                f"Could not find devcontainer.json in {path} or parent directories"
+        if devcontainer_file is not None:
+            self.devcontainer_file = Path(devcontainer_file)
+            # .devcontainer/devcontainer.json or .devcontainer.json at the root
+            parent = self.devcontainer_file.parent
+            self.project_root = (
+                parent.parent if parent.name == ".devcontainer" else parent
             )
+        else:
+            if path is None:
+                path = Path.cwd()
+
+            # Find project root
+            self.project_root = find_project_root(path)
+            if self.project_root is None:
+                raise ValueError(
+                    f"Could not find devcontainer.json in {path} or parent directories"
+                )
 
-        # Find devcontainer.json
-        self.devcontainer_file = find_devcontainer_json(self.project_root)
-        if self.devcontainer_file is None:
-            raise ValueError(f"Could not find devcontainer.json in {self.project_root}")
+            # Find devcontainer.json
+            self.devcontainer_file = find_devcontainer_json(self.project_root)
+            if self.devcontainer_file is None:
+                raise ValueError(
+                    f"Could not find devcontainer.json in {self.project_root}"
+                )
 
         # Parse ports from devcontainer.json
         self._base_ports = parse_devcontainer_ports(self.devcontainer_file)
@@ -75,10 +98,14 @@ class SandboxManager:
         # Get working directory
         self._workdir = get_devcontainer_workdir(self.devcontainer_file)
 
-        # Initialize clients
-        self._docker = DockerClient(self.project_root)
+        # Initialize git client (Docker client is created on first use)
         self._git = GitClient(self.project_root)
 
+    @cached_property
+    def _docker(self) -> DockerClient:
+        """Docker client, created on first use."""
+        return DockerClient(self.project_root, use_api=True)
+
     def _get_next_port_offset(self) -> int:
         """Calculate the next available port offset.
 
@@ -94,10 +121,8 @@ class SandboxManager:
         base_port = self._base_ports[0]
         max_offset = -1
 
-        containers = self._docker.list_sandbox_containers()
-        for container in containers:
-            sandbox_name = self._docker.get_sandbox_name_from_container(container)
-            ports = self._docker.get_container_ports(sandbox_name)
+        for container in self._docker.list_sandbox_container_info():
+            ports = container.ports
             if base_port in ports:
                 host_port = ports[base_port]
                 offset = host_port - base_port
@@ -123,6 +148,7 @@ class SandboxManager:
         branch: Optional[str] = None,
         on_progress: Optional[ProgressCallback] = None,
         on_build_output: Optional[OutputCallback] = None,
+        state: Optional[ContainerState] = None,
     ) -> SandboxInfo:
         """Start a new sandbox.
 
@@ -130,7 +156,11 @@ class SandboxManager:
             name: The sandbox name.
             branch: Optional branch name. Creates sandbox/<name> if not provided.
             on_progress: Optional callback for progress updates.
-            on_build_output: Optional callback for build output lines.
+            on_build_output: Optional callback for build output lines. For a
+                new container the image is built in a worker thread, so this
+                may be called from that thread.
+            state: Container state from a prior state() call, to avoid
+                querying Docker again.
 
         Returns:
             SandboxInfo with details about the started sandbox.
@@ -142,7 +172,9 @@ class SandboxManager:
 
         # Check if already running
         progress("Checking for existing sandbox...")
-        if self._docker.container_exists(name):
+        if state is None:
+            state = self._docker.get_container_state(name)
+        if state == ContainerState.RUNNING:
             # Return existing sandbox info
             ports = self._docker.get_container_ports(name)
             branch_name = self._git.get_current_branch(name)
@@ -155,19 +187,53 @@ class SandboxManager:
                 sandbox_path=sandbox_path,
             )
 
-        # Create sandbox clone from git server
-        progress("Setting up git server...")
-        self._git.ensure_git_server()
-
-        progress("Creating sandbox clone...")
-        sandbox_path = self._git.create_sandbox(name, branch)
-
-        # Calculate port offset and build port mapping
-        offset = self._get_next_port_offset()
-        ports = self._build_port_mapping(offset)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            # A new container needs its image built, which doesn't depend on
+            # the sandbox clone, so build it while git is set up. The build's
+            # progress is only recorded here and reported from this thread
+            # once git is done, so the two don't overwrite each other.
+            image_future = None
+            image_steps: list[str] = []
+            if state == ContainerState.NOT_FOUND:
+                image_future = executor.submit(
+                    self._docker.prepare_image,
+                    name,
+                    self._context_path,
+                    self._dockerfile,
+                    self._base_image,
+                    on_progress=image_steps.append,
+                    on_build_output=on_build_output,
+                )
 
-        # Start container (this includes building if needed)
-        progress("Building container image...")
+            try:
+                # Create sandbox clone from git server
+                progress("Setting up git server...")
+                self._git.ensure_git_server()
+
+                progress("Creating sandbox clone...")
+                sandbox_path = self._git.create_sandbox(name, branch)
+
+                # Calculate port offset and build port mapping
+                offset = self._get_next_port_offset()
+                ports = self._build_port_mapping(offset)
+            except BaseException:
+                # Leaving the executor waits for the build, so stop it rather
+                # than make the user wait before seeing the error
+                if image_future is not None:
+                    self._docker.cancel_build()
+                raise
+
+            run_image = None
+            if image_future is not None:
+                if not image_future.done():
+                    progress(
+                        image_steps[-1]
+                        if image_steps
+                        else "Preparing container image..."
+                    )
+                run_image = image_future.result()
+
+        # Start container (this includes building if still needed)
         self._docker.start_container(
             sandbox_name=name,
             context_path=self._context_path,
@@ -180,6 +246,8 @@ class SandboxManager:
             mounts=get_mounts(self.project_root, self._workdir),
             on_progress=on_progress,
             on_build_output=on_build_output,
+            container_state=state,
+            run_image=run_image,
         )
 
         # Get actual branch name
@@ -192,6 +260,17 @@ class SandboxManager:
             sandbox_path=sandbox_path,
         )
 
+    def state(self, name: str) -> ContainerState:
+        """Get the container state of a sandbox.
+
+        Args:
+            name: The sandbox name.
+
+        Returns:
+            ContainerState of the sandbox container.
+        """
+        return self._docker.get_container_state(name)
+
     def stop(self, name: str) -> None:
         """Stop a sandbox.
 
@@ -209,15 +288,29 @@ class SandboxManager:
         Returns:
             List of stopped sandbox names.
         """
-        containers = self._docker.list_sandbox_containers(all_namespaces=all_namespaces)
-        stopped = []
+        return list(self.iter_stop_all(all_namespaces=all_namespaces))
 
-        for container in containers:
-            name = self._docker.get_sandbox_name_from_container(container)
-            self._docker.stop_container(name)
-            stopped.append(name)
+    def iter_stop_all(self, all_namespaces: bool = False) -> Iterator[str]:
+        """Stop all running sandboxes, yielding names as they stop.
+
+        Args:
+            all_namespaces: If False, only stop sandboxes from this namespace.
+
+        Yields:
+            Names of stopped sandboxes.
+        """
+        # One docker ps gives container and sandbox names (from the label),
+        # and one docker stop stops them all. Stopping by container name also
+        # covers containers from other namespaces.
+        containers = self._docker.list_sandbox_container_info(
+            all_namespaces=all_namespaces
+        )
+        if not containers:
+            return
 
-        return stopped
+        names = {c.container_name: c.sandbox_name for c in containers}
+        for container in self._docker.stop_containers(list(names)):
+            yield names.get(container, container)
 
     def remove(self, name: str) -> None:
         """Remove a sandbox (stop container and delete sandbox clone).
@@ -225,8 +318,7 @@ class SandboxManager:
         Args:
             name: The sandbox name.
         """
-        # Stop and remove container
-        self._docker.stop_container(name)
+        # docker rm -f kills a running container itself, so no separate stop
         self._docker.remove_container(name)
 
         # Remove sandbox clone
@@ -241,28 +333,26 @@ class SandboxManager:
         Returns:
             List of SandboxInfo for each running sandbox.
         """
-        containers = self._docker.list_sandbox_containers(all_namespaces=all_namespaces)
+        # Names (from the container label) and ports come from one docker ps
+        containers = self._docker.list_sandbox_container_info(
+            all_namespaces=all_namespaces
+        )
         sandboxes = []
 
         for container in containers:
-            # Get sandbox name from container label (more reliable than parsing name)
-            name = self._docker.get_sandbox_name_from_container(container)
-            sandbox_path = self._git.sandbox_path(name)
+            sandbox_path = self._git.sandbox_path(container.sandbox_name)
 
             # Handle case where sandbox directory was deleted but container still exists
             if sandbox_path.exists():
-                branch = self._git.get_current_branch(name)
+                branch = self._git.get_current_branch(container.sandbox_name)
             else:
                 branch = "(orphaned)"
 
-            # Get ports using the sandbox name
-            ports = self._docker.get_container_ports(name)
-
             sandboxes.append(
                 SandboxInfo(
-                    name=name,
+                    name=container.sandbox_name,
                     branch=branch,
-                    ports=ports,
+                    ports=container.ports,
                     sandbox_path=sandbox_path,
                 )
             )
@@ -289,17 +379,20 @@ class SandboxManager:
         """
         self._docker.show_logs(name, follow)
 
-    def connect(self, name: str, shell: Optional[str] = None) -> None:
+    def connect(self, name: str, shell: Optional[str] = None) -> int:
         """Connect to a sandbox's shell.
 
         Args:
             name: The sandbox name.
             shell: The shell to use. If None, uses user config default or /bin/bash.
+
+        Returns:
+            The exit status of the shell.
         """
         # Use provided shell, or fall back to user config, or /bin/bash
         if shell is None:
             shell = get_default_shell() or "/bin/bash"
-        self._docker.exec_shell(name, shell)
+        return self._docker.exec_shell(name, shell)
 
     def merge(self, name: str) -> tuple[bool, str]:
         """Merge a sandbox's changes into the current branch.
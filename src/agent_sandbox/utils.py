@@ -1,7 +1,9 @@
 """Utility functions for agent-sandbox."""
 
 import json
+import os
 import re
+from functools import lru_cache
 from pathlib import Path
 import random
 from typing import Optional
@@ -25,7 +27,16 @@ def find_project_root(start_path: Optional[Path] = None) -> Optional[Path]:
     if start_path is None:
         start_path = Path.cwd()
 
-    start_path = Path(start_path).resolve()
+    return _find_project_root(Path(start_path).resolve())
+
+
+@lru_cache(maxsize=32)
+def _find_project_root(start_path: Path) -> Optional[Path]:
+    """Search upward from a resolved path, memoized for the process lifetime.
+
+    Completion, connect and SandboxManager all look up the project root
+    within one invocation, so the walk is only done once per start path.
+    """
     current = start_path
 
     # Walk up the directory tree
@@ -43,6 +54,14 @@ def find_project_root(start_path: Optional[Path] = None) -> Optional[Path]:
     return None
 
 
+def clear_project_root_cache() -> None:
+    """Forget memoized find_project_root results.
+
+    Call after creating a devcontainer.json so later lookups see it.
+    """
+    _find_project_root.cache_clear()
+
+
 def find_devcontainer_json(project_root: Path) -> Optional[Path]:
     """Find the devcontainer.json file in the project.
 
@@ -68,9 +87,20 @@ def parse_devcontainer_json(devcontainer_file: Path) -> dict:
         devcontainer_file: Path to devcontainer.json.
 
     Returns:
-        Parsed devcontainer configuration dict.
+        Parsed devcontainer configuration dict. The dict is shared between
+        callers and must not be modified.
     """
-    content = devcontainer_file.read_text()
+    # SandboxManager reads ports, build context, image and workdir from the
+    # same file, so parse it once per file version
+    st = os.stat(devcontainer_file)
+    return _parse_devcontainer_json(str(devcontainer_file), st.st_mtime_ns, st.st_size)
+
+
+@lru_cache(maxsize=8)
+def _parse_devcontainer_json(devcontainer_file: str, mtime_ns: int, size: int) -> dict:
+    """Parse a devcontainer.json, memoized per file version."""
+    with open(devcontainer_file) as f:
+        content = f.read()
 
     # Strip single-line comments (// ...)
     content = re.sub(r"//.*$", "", content, flags=re.MULTILINE)
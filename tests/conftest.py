@@ -7,6 +7,19 @@ from unittest.mock import MagicMock
 
 import pytest
 
+from agent_sandbox.config import clear_config_cache
+from agent_sandbox.init import clear_git_root_cache
+from agent_sandbox.utils import clear_project_root_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_path_caches():
+    """Reset memoized project/git root and config lookups between tests."""
+    clear_project_root_cache()
+    clear_config_cache()
+    clear_git_root_cache()
+    yield
+
 
 @pytest.fixture
 def temp_project_dir():
@@ -1,7 +1,25 @@
 """Tests for CLI commands."""
 
+import json
+import subprocess
+import sys
+import threading
+from unittest.mock import MagicMock, patch
+
+import click
 from click.testing import CliRunner
-from agent_sandbox.cli import main, complete_sandbox_names
+from agent_sandbox.cli import (
+    _BuildLog,
+    _cached_sandbox_names,
+    _completion_cache_path,
+    _detect_shell,
+    _docker_reachable,
+    _get_bash_version_output,
+    _list_sandbox_names,
+    complete_sandbox_names,
+    get_manager,
+    main,
+)
 
 
 class TestCompletionCommand:
@@ -49,6 +67,40 @@ class TestCompletionCommand:
         assert "fish" in result.output
         assert "--install" in result.output
 
+    def test_completion_install_writes_script(self, tmp_path):
+        """Test --install writes Click's completion script without a subprocess."""
+        runner = CliRunner()
+        with (
+            patch("agent_sandbox.cli.Path.home", return_value=tmp_path),
+            patch("agent_sandbox.cli._validate_shell_requirements"),
+            patch("subprocess.run") as mock_run,
+        ):
+            result = runner.invoke(main, ["completion", "fish", "--install"])
+
+        assert result.exit_code == 0
+        script = tmp_path / ".config" / "fish" / "completions" / "agent-sandbox.fish"
+        assert "_AGENT_SANDBOX_COMPLETE=fish_complete" in script.read_text()
+        mock_run.assert_not_called()
+
+
+class TestDetectShell:
+    """Test shell auto-detection."""
+
+    def test_detects_shell_from_path(self, monkeypatch):
+        """Should detect the shell from the executable name."""
+        monkeypatch.setenv("SHELL", "/usr/bin/zsh")
+        assert _detect_shell() == "zsh"
+
+    def test_ignores_similar_names(self, monkeypatch):
+        """Should not match shells whose names merely contain a known shell."""
+        monkeypatch.setenv("SHELL", "/usr/local/bin/bashful")
+        assert _detect_shell() is None
+
+    def test_returns_none_without_shell(self, monkeypatch):
+        """Should return None when SHELL is unset."""
+        monkeypatch.delenv("SHELL", raising=False)
+        assert _detect_shell() is None
+
 
 class TestSandboxNameCompletion:
     """Test sandbox name completion functionality."""
@@ -87,3 +139,348 @@ class TestSandboxNameCompletion:
         # Should not raise exceptions even if manager fails
         result = complete_sandbox_names(ctx, param, "anything")
         assert isinstance(result, list)
+
+    def test_complete_returns_all_names_for_empty_prefix(self, tmp_path, monkeypatch):
+        """Should return every cached name when nothing has been typed."""
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+        ctx = MagicMock(params={})
+
+        with patch(
+            "agent_sandbox.cli._list_sandbox_names", return_value=["bob", "alice"]
+        ):
+            assert complete_sandbox_names(ctx, None, "") == ["bob", "alice"]
+            assert complete_sandbox_names(ctx, None, "al") == ["alice"]
+
+
+class TestCompletionCache:
+    """Test the on-disk completion cache."""
+
+    def test_reuses_fresh_cache(self, tmp_path, monkeypatch):
+        """Should only enumerate sandboxes once within the TTL."""
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+
+        with patch(
+            "agent_sandbox.cli._list_sandbox_names", return_value=["alice", "bob"]
+        ) as mock_list:
+            first = _cached_sandbox_names(tmp_path, False)
+            second = _cached_sandbox_names(tmp_path, False)
+
+        assert first == ["alice", "bob"]
+        assert second == ["alice", "bob"]
+        mock_list.assert_called_once()
+
+    def test_refreshes_expired_cache(self, tmp_path, monkeypatch):
+        """Should enumerate again once the cache is older than the TTL."""
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+        cache_path = _completion_cache_path(tmp_path, False)
+        cache_path.parent.mkdir(parents=True)
+        cache_path.write_text(json.dumps({"ts": 0, "names": ["stale"]}))
+
+        with patch(
+            "agent_sandbox.cli._list_sandbox_names", return_value=["fresh"]
+        ) as mock_list:
+            result = _cached_sandbox_names(tmp_path, False)
+
+        assert result == ["fresh"]
+        mock_list.assert_called_once()
+
+    def test_keys_cache_by_namespace_scope(self, tmp_path):
+        """Should use separate cache files for project and all namespaces."""
+        assert _completion_cache_path(tmp_path, False) != _completion_cache_path(
+            tmp_path, True
+        )
+
+
+class TestDockerReachable:
+    """Test the Docker reachability check used by completion."""
+
+    def test_remembers_unreachable_daemon(self, tmp_path, monkeypatch):
+        """Should not probe again while the daemon is known to be down."""
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+
+        with patch(
+            "agent_sandbox.docker.docker_daemon_reachable", return_value=False
+        ) as mock_probe:
+            assert _docker_reachable() is False
+            assert _docker_reachable() is False
+
+        mock_probe.assert_called_once()
+
+    def test_skips_manager_when_daemon_down(self, tmp_path, monkeypatch):
+        """Should fall back to filesystem names without building a manager."""
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / ".devcontainer.json").write_text("{}")
+        (tmp_path / ".sandboxes" / "alice").mkdir(parents=True)
+
+        with (
+            patch("agent_sandbox.cli._docker_reachable", return_value=False),
+            patch("agent_sandbox.cli.get_manager") as mock_get_manager,
+        ):
+            assert _list_sandbox_names(False) == ["alice"]
+
+        mock_get_manager.assert_not_called()
+
+
+class TestListSandboxNames:
+    """Test merging of running and filesystem sandbox names."""
+
+    def test_running_first_without_duplicates(self, tmp_path, monkeypatch):
+        """Should list running sandboxes first and each name once."""
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / ".devcontainer.json").write_text("{}")
+        (tmp_path / ".sandboxes" / "alice").mkdir(parents=True)
+        (tmp_path / ".sandboxes" / "carol").mkdir()
+        (tmp_path / ".sandboxes" / "notes.txt").write_text("")
+
+        manager = MagicMock()
+        manager.list.return_value = [MagicMock(), MagicMock()]
+        manager.list.return_value[0].name = "bob"
+        manager.list.return_value[1].name = "alice"
+
+        with (
+            patch("agent_sandbox.cli._docker_reachable", return_value=True),
+            patch("agent_sandbox.cli.get_manager", return_value=manager),
+        ):
+            result = _list_sandbox_names(False)
+
+        assert result == ["bob", "alice", "carol"]
+
+
+class TestBashVersionCache:
+    """Test caching of the bash --version probe."""
+
+    def test_runs_probe_once(self, tmp_path, monkeypatch):
+        """Should reuse the cached version while the bash binary is unchanged."""
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+
+        with patch("agent_sandbox.cli.subprocess.run") as mock_run:
+            mock_run.return_value = MagicMock(
+                returncode=0, stdout="GNU bash, version 5.2.15(1)-release\nmore\n"
+            )
+            first = _get_bash_version_output()
+            second = _get_bash_version_output()
+
+        assert first == "GNU bash, version 5.2.15(1)-release"
+        assert second == first
+        mock_run.assert_called_once()
+
+    def test_returns_empty_without_bash(self, tmp_path, monkeypatch):
+        """Should not spawn anything when bash is not on PATH."""
+        monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+
+        with (
+            patch("agent_sandbox.cli.shutil.which", return_value=None),
+            patch("agent_sandbox.cli.subprocess.run") as mock_run,
+        ):
+            assert _get_bash_version_output() == ""
+
+        mock_run.assert_not_called()
+
+
+class TestGetManager:
+    """Test SandboxManager reuse within one CLI invocation."""
+
+    def test_reuses_manager_in_same_context(self):
+        """Should construct the manager once per Click context."""
+        with patch("agent_sandbox.manager.SandboxManager") as mock_manager_class:
+            with click.Context(main, obj={}):
+                first = get_manager()
+                second = get_manager()
+
+        assert first is second
+        mock_manager_class.assert_called_once_with()
+
+    def test_new_manager_per_context(self):
+        """Should not share the manager between separate invocations."""
+        with patch("agent_sandbox.manager.SandboxManager") as mock_manager_class:
+            with click.Context(main, obj={}):
+                get_manager()
+            with click.Context(main, obj={}):
+                get_manager()
+
+        assert mock_manager_class.call_count == 2
+
+    def test_works_without_context(self):
+        """Should still return a manager when called outside Click."""
+        with patch("agent_sandbox.manager.SandboxManager") as mock_manager_class:
+            assert get_manager() is mock_manager_class.return_value
+
+
+class TestInitCommand:
+    """Test the init command."""
+
+    def _make_repo(self, tmp_path):
+        subprocess.run(["git", "init"], cwd=tmp_path, capture_output=True, check=True)
+        devcontainer_dir = tmp_path / ".devcontainer"
+        devcontainer_dir.mkdir()
+        (devcontainer_dir / "devcontainer.json").write_text("{}")
+
+    def test_prompts_before_overwriting(self, tmp_path):
+        """Should leave an existing config alone when the prompt is declined."""
+        self._make_repo(tmp_path)
+
+        result = CliRunner().invoke(main, ["init", "-p", str(tmp_path)], input="n\n")
+
+        assert result.exit_code == 0
+        assert "Overwrite?" in result.output
+        assert (tmp_path / ".devcontainer" / "devcontainer.json").read_text() == "{}"
+
+    def test_yes_overwrites_without_prompt(self, tmp_path):
+        """Should overwrite without prompting when --yes is given."""
+        self._make_repo(tmp_path)
+
+        result = CliRunner().invoke(main, ["init", "-p", str(tmp_path), "--yes"])
+
+        assert result.exit_code == 0
+        assert "Overwrite?" not in result.output
+        assert (tmp_path / ".devcontainer" / "Dockerfile").exists()
+
+
+class TestPortsCommand:
+    """Test the ports command."""
+
+    def test_prints_port_mappings(self):
+        """Should print each mapping verbatim."""
+        manager = MagicMock()
+        manager.ports.return_value = {8000: 8001, 5173: 5174}
+
+        with patch("agent_sandbox.cli.get_manager", return_value=manager):
+            result = CliRunner().invoke(main, ["ports", "quick-fox"])
+
+        assert result.exit_code == 0
+        assert "  8000/tcp -> 0.0.0.0:8001\n" in result.output
+        assert "  5173/tcp -> 0.0.0.0:5174\n" in result.output
+
+    def test_reports_missing_ports(self):
+        """Should say when a sandbox has no ports."""
+        manager = MagicMock()
+        manager.ports.return_value = {}
+
+        with patch("agent_sandbox.cli.get_manager", return_value=manager):
+            result = CliRunner().invoke(main, ["ports", "quick-fox"])
+
+        assert result.exit_code == 0
+        assert "No ports found for sandbox 'quick-fox'" in result.output
+
+
+class TestListCommand:
+    """Test the ps command."""
+
+    def test_prints_table(self):
+        """Should list running sandboxes in a table."""
+        manager = MagicMock()
+        manager._docker.namespace = "project-1234abcd"
+        manager.list.return_value = [
+            MagicMock(branch="sandbox/quick-fox", ports_str="8000:8001"),
+        ]
+        manager.list.return_value[0].name = "quick-fox"
+
+        with patch("agent_sandbox.cli.get_manager", return_value=manager):
+            result = CliRunner().invoke(main, ["ps"])
+
+        assert result.exit_code == 0
+        assert "Running Sandboxes (project-1234abcd)" in result.output
+        assert "quick-fox" in result.output
+        assert "8000:8001" in result.output
+        manager.list.assert_called_once_with(all_namespaces=False)
+
+    def test_reports_no_sandboxes(self):
+        """Should explain how to see other projects when nothing is running."""
+        manager = MagicMock()
+        manager.list.return_value = []
+
+        with patch("agent_sandbox.cli.get_manager", return_value=manager):
+            result = CliRunner().invoke(main, ["ps"])
+
+        assert result.exit_code == 0
+        assert "No sandboxes running for this project." in result.output
+
+    def test_propagates_list_errors(self):
+        """Should surface errors raised while listing."""
+        manager = MagicMock()
+        manager.list.side_effect = RuntimeError("docker is down")
+
+        with patch("agent_sandbox.cli.get_manager", return_value=manager):
+            result = CliRunner().invoke(main, ["ps"])
+
+        assert isinstance(result.exception, RuntimeError)
+
+
+class TestLazyImports:
+    """Test that importing the CLI stays cheap."""
+
+    def test_cli_import_skips_heavy_modules(self):
+        """Should not import manager, config or rich at startup."""
+        code = (
+            "import sys, agent_sandbox.cli; "
+            "print(' '.join(m for m in ("
+            "'agent_sandbox.manager', 'agent_sandbox.config', "
+            "'rich.console', 'rich.live', 'rich.table') if m in sys.modules))"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        )
+        assert result.stdout.strip() == ""
+
+
+class TestBuildLog:
+    """Test the build output buffer shown while starting a sandbox."""
+
+    def test_keeps_last_lines(self):
+        """Should keep only the most recent maxlen lines."""
+        log = _BuildLog(3)
+        for i in range(5):
+            log.append(f"line {i}")
+
+        assert len(log) == 3
+        assert log.__rich__().plain == "line 2\nline 3\nline 4"
+
+    def test_reuses_text_until_new_output(self):
+        """Should only rebuild the rendered text after new lines arrive."""
+        log = _BuildLog(3)
+        log.append("line 1")
+        first = log.__rich__()
+
+        assert log.__rich__() is first
+
+        log.append("line 2")
+        assert log.__rich__() is not first
+        assert log.__rich__().plain == "line 1\nline 2"
+
+    def test_renders_while_another_thread_appends(self):
+        """Should not fail when a render and an append overlap."""
+        log = _BuildLog(100)
+        done = threading.Event()
+
+        def build():
+            for i in range(20000):
+                log.append(f"line {i}")
+            done.set()
+
+        thread = threading.Thread(target=build)
+        thread.start()
+        while not done.is_set():
+            log.__rich__()
+        thread.join()
+
+        assert log.__rich__().plain.endswith("line 19999")
+
+    def test_empty_is_falsy(self):
+        """Should be falsy until output arrives."""
+        log = _BuildLog(3)
+        assert not log
+        log.append("step 1")
+        assert log
+
+    def test_renders_inside_panel(self):
+        """Should render through rich like any other renderable."""
+        from rich.console import Console
+        from rich.panel import Panel
+
+        console = Console(width=40, record=True)
+        log = _BuildLog(2)
+        log.append("Step 1/3")
+        console.print(Panel(log))
+
+        assert "Step 1/3" in console.export_text()
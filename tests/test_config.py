@@ -1,8 +1,10 @@
 """Tests for config management."""
 
+import os
 from pathlib import Path
 
 from agent_sandbox.config import (
+    clear_config_cache,
     find_project_config,
     get_default_shell,
     get_git_email,
@@ -11,6 +13,7 @@ from agent_sandbox.config import (
     get_user_config_path,
     load_config,
     load_config_file,
+    tomllib,
 )
 
 
@@ -76,6 +79,43 @@ class TestFindProjectConfig:
         result = find_project_config()
         assert result is None
 
+    def test_uses_explicit_start_path(self, tmp_path):
+        """Should search from start_path instead of cwd when given."""
+        config_file = tmp_path / "agent-sandbox.toml"
+        config_file.write_text('shell = "/bin/bash"\n')
+
+        assert find_project_config(tmp_path) == config_file
+
+    def test_skips_unreadable_directories(self, tmp_path, mocker):
+        """Should keep searching upward past directories it cannot list."""
+        config_file = tmp_path / "agent-sandbox.toml"
+        config_file.write_text('shell = "/bin/bash"\n')
+        subdir = tmp_path / "locked"
+        subdir.mkdir()
+
+        real_scandir = os.scandir
+
+        def scandir(path):
+            if path == str(subdir):
+                raise PermissionError(path)
+            return real_scandir(path)
+
+        mocker.patch("agent_sandbox.config.os.scandir", side_effect=scandir)
+
+        assert find_project_config(subdir) == config_file
+
+    def test_memoizes_lookup_until_cleared(self, tmp_path, monkeypatch):
+        """Should cache the search result until clear_config_cache is called."""
+        monkeypatch.chdir(tmp_path)
+        assert find_project_config() is None
+
+        config_file = tmp_path / "agent-sandbox.toml"
+        config_file.write_text('shell = "/bin/bash"\n')
+        assert find_project_config() is None
+
+        clear_config_cache()
+        assert find_project_config() == config_file
+
 
 class TestLoadConfigFile:
     """Tests for load_config_file function."""
@@ -96,6 +136,33 @@ class TestLoadConfigFile:
         result = load_config_file(config_file)
         assert result == {}
 
+    def test_returns_empty_on_missing_file(self, tmp_path):
+        """Should return empty dict when the file does not exist."""
+        assert load_config_file(tmp_path / "missing.toml") == {}
+
+    def test_parses_file_once(self, tmp_path, mocker):
+        """Should reuse the parsed config while the file is unchanged."""
+        config_file = tmp_path / "config.toml"
+        config_file.write_text('shell = "/usr/bin/fish"\n')
+        spy = mocker.spy(tomllib, "load")
+
+        load_config_file(config_file)
+        load_config_file(config_file)
+
+        assert spy.call_count == 1
+
+    def test_reparses_modified_file(self, tmp_path):
+        """Should pick up changes when the file is rewritten."""
+        config_file = tmp_path / "config.toml"
+        config_file.write_text('shell = "/usr/bin/fish"\n')
+        load_config_file(config_file)
+
+        config_file.write_text('shell = "/bin/zsh"\n')
+        st = config_file.stat()
+        os.utime(config_file, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+        assert load_config_file(config_file) == {"shell": "/bin/zsh"}
+
 
 class TestLoadConfig:
     """Tests for load_config function."""
@@ -134,6 +201,52 @@ class TestLoadConfig:
         # User-only settings are preserved
         assert result["user_only"] == "value"
 
+    def test_memoized_per_working_directory(self, tmp_path, monkeypatch, mocker):
+        """Should merge config once per cwd until the cache is cleared."""
+        (tmp_path / "agent-sandbox.toml").write_text('shell = "/usr/bin/fish"\n')
+        monkeypatch.chdir(tmp_path)
+        user_path = mocker.patch(
+            "agent_sandbox.config.get_user_config_path",
+            return_value=tmp_path / "missing.toml",
+        )
+
+        get_default_shell()
+        get_git_name()
+        load_config()["shell"] = "mutated"
+
+        assert user_path.call_count == 1
+        assert load_config() == {"shell": "/usr/bin/fish"}
+
+        (tmp_path / "agent-sandbox.toml").write_text('shell = "/bin/zsh"\n')
+        clear_config_cache()
+        assert load_config() == {"shell": "/bin/zsh"}
+
+    def test_nested_tables_are_copied(self, tmp_path, monkeypatch, mocker):
+        """Should not let callers modify nested tables of the cached config."""
+        (tmp_path / "agent-sandbox.toml").write_text('[git]\nname = "Alice"\n')
+        monkeypatch.chdir(tmp_path)
+        mocker.patch(
+            "agent_sandbox.config.get_user_config_path",
+            return_value=tmp_path / "missing.toml",
+        )
+
+        load_config()["git"]["name"] = "mutated"
+
+        assert get_git_name() == "Alice"
+
+    def test_follows_working_directory(self, tmp_path, monkeypatch):
+        """Should load the project config for the current directory."""
+        first = tmp_path / "first"
+        second = tmp_path / "second"
+        for project, shell in ((first, "/bin/bash"), (second, "/bin/zsh")):
+            project.mkdir()
+            (project / "agent-sandbox.toml").write_text(f'shell = "{shell}"\n')
+
+        monkeypatch.chdir(first)
+        assert load_config()["shell"] == "/bin/bash"
+        monkeypatch.chdir(second)
+        assert load_config()["shell"] == "/bin/zsh"
+
 
 class TestGetDefaultShell:
     """Tests for get_default_shell function."""
@@ -217,6 +330,12 @@ class TestGetDefaultShell:
         result = get_default_shell()
         assert result is None
 
+    def test_ignores_shell_init_table(self):
+        """Should not return the [shell] init table as the default shell."""
+        config = {"shell": {"init": ["direnv allow"]}}
+
+        assert get_default_shell(config) is None
+
 
 class TestGetGitName:
     """Tests for get_git_name function."""
@@ -252,6 +371,15 @@ class TestGetGitName:
         result = get_git_name()
         assert result is None
 
+    def test_uses_provided_config(self, mocker):
+        """Should read the given config dict instead of loading config."""
+        load = mocker.patch("agent_sandbox.config.load_config")
+
+        result = get_git_name({"git": {"name": "Jane"}})
+
+        assert result == "Jane"
+        load.assert_not_called()
+
 
 class TestGetGitEmail:
     """Tests for get_git_email function."""
@@ -291,6 +419,16 @@ class TestGetGitEmail:
 class TestGetMounts:
     """Tests for get_mounts function."""
 
+    def test_uses_provided_config(self, tmp_path, mocker):
+        """Should read mounts from the given config dict."""
+        load = mocker.patch("agent_sandbox.config.load_config")
+        config = {"files": {"mounts": ["/host:/dest"]}}
+
+        result = get_mounts(tmp_path, config=config)
+
+        assert result == [("/host", "/dest")]
+        load.assert_not_called()
+
     def test_gets_mounts_from_config(self, tmp_path, monkeypatch):
         """Should get mounts from config file."""
         config_file = tmp_path / "agent-sandbox.toml"
@@ -472,3 +610,29 @@ class TestGetMounts:
         assert len(result) == 2
         assert result[0][1] == "/app/.envrc"
         assert result[1][1] == "/app/config.json"
+
+    def test_normalizes_without_resolving_symlinks(self, tmp_path, monkeypatch):
+        """Should normalize the source path but keep symlinks by default."""
+        (tmp_path / "real").mkdir()
+        (tmp_path / "link").symlink_to(tmp_path / "real")
+        config_file = tmp_path / "agent-sandbox.toml"
+        config_file.write_text('[files]\nmounts = ["sub/../link:/dest"]\n')
+
+        monkeypatch.chdir(tmp_path)
+
+        result = get_mounts(project_root=tmp_path)
+        assert result == [(str(tmp_path / "link"), "/dest")]
+
+    def test_resolves_symlinks_when_enabled(self, tmp_path, monkeypatch):
+        """Should resolve symlinks when [files].resolve_symlinks is true."""
+        (tmp_path / "real").mkdir()
+        (tmp_path / "link").symlink_to(tmp_path / "real")
+        config_file = tmp_path / "agent-sandbox.toml"
+        config_file.write_text(
+            '[files]\nresolve_symlinks = true\nmounts = ["link:/dest"]\n'
+        )
+
+        monkeypatch.chdir(tmp_path)
+
+        result = get_mounts(project_root=tmp_path)
+        assert result == [(str((tmp_path / "real").resolve()), "/dest")]
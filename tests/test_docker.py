@@ -1,10 +1,28 @@
 """Tests for Docker client."""
 
+import os
+import socket
+import subprocess
+import threading
 from unittest.mock import MagicMock, patch
 
 import pytest
 
-from agent_sandbox.docker import ContainerState, DockerClient, sanitize_docker_name
+from agent_sandbox.docker import (
+    _read_lines,
+    ContainerState,
+    METADATA_CACHE_TTL,
+    DockerClient,
+    STOP_TIMEOUT,
+    SandboxContainer,
+    docker_api_get,
+    docker_daemon_reachable,
+    dockerfile_build_hash,
+    parse_api_ports,
+    parse_inspect_ports,
+    parse_ps_ports,
+    sanitize_docker_name,
+)
 
 
 class TestDockerClient:
@@ -58,6 +76,7 @@ class TestSanitizeDockerName:
         """Should replace invalid characters with dashes."""
         assert sanitize_docker_name("name@test") == "name-test"
         assert sanitize_docker_name("name:test") == "name-test"
+        assert sanitize_docker_name("naïve test") == "na-ve-test"
 
     def test_ensures_alphanumeric_start(self):
         """Should ensure name starts with alphanumeric."""
@@ -74,12 +93,12 @@ class TestDockerClientBuildImage:
         context = tmp_path / "context"
         context.mkdir()
 
-        with patch("subprocess.run") as mock_run:
-            mock_run.return_value = MagicMock(returncode=0)
+        with patch("subprocess.Popen") as mock_popen:
+            mock_popen.return_value.returncode = 0
 
             client.build_image("alice", context, "Dockerfile")
 
-            call_args = mock_run.call_args[0][0]
+            call_args = mock_popen.call_args[0][0]
             assert "docker" in call_args
             assert "build" in call_args
             assert "-t" in call_args
@@ -90,12 +109,124 @@ class TestDockerClientBuildImage:
         """Should raise RuntimeError on build failure."""
         client = DockerClient(tmp_path)
 
-        with patch("subprocess.run") as mock_run:
-            mock_run.return_value = MagicMock(returncode=1, stderr="build error")
+        with patch("subprocess.Popen") as mock_popen:
+            mock_popen.return_value.returncode = 1
+            mock_popen.return_value.stderr = MagicMock()
+            mock_popen.return_value.stderr.__iter__.return_value = ["build error\n"]
+
+            with pytest.raises(RuntimeError, match="docker build failed: build error"):
+                client.build_image("alice", tmp_path, "Dockerfile")
+
+    def test_streamed_failure_reports_output_tail(self, tmp_path):
+        """Should include only the last build lines in the error."""
+        client = DockerClient(tmp_path)
+        lines = [f"step {i}\n" for i in range(100)]
+        on_output = MagicMock()
+
+        read_fd, write_fd = os.pipe()
+        os.write(write_fd, "".join(lines).encode())
+        os.close(write_fd)
+
+        with patch("subprocess.Popen") as mock_popen, open(read_fd, "rb", 0) as out:
+            process = mock_popen.return_value
+            process.stdout = out
+            process.returncode = 1
+
+            with pytest.raises(RuntimeError) as excinfo:
+                client.build_image("alice", tmp_path, "Dockerfile", on_output=on_output)
+
+        message = str(excinfo.value)
+        assert on_output.call_count == 100
+        assert "step 99" in message
+        assert "step 80" in message
+        assert "step 79" not in message
+
+    def test_failure_reports_stderr_tail(self, tmp_path):
+        """Should keep only the last stderr lines of a failed build."""
+        client = DockerClient(tmp_path)
+        lines = [f"step {i}\n" for i in range(100)]
+
+        with patch("subprocess.Popen") as mock_popen:
+            process = mock_popen.return_value
+            process.stderr = MagicMock()
+            process.stderr.__iter__.return_value = lines
+            process.returncode = 1
+
+            with pytest.raises(RuntimeError) as excinfo:
+                client.build_image("alice", tmp_path, "Dockerfile")
+
+            assert mock_popen.call_args[1]["stdout"] == subprocess.DEVNULL
+        message = str(excinfo.value)
+        assert "step 99" in message
+        assert "step 80" in message
+        assert "step 79" not in message
+
+
+class TestDockerClientCancelBuild:
+    """Tests for cancel_build method."""
 
-            with pytest.raises(RuntimeError, match="docker build failed"):
+    def test_stops_running_build(self, tmp_path):
+        """Should terminate a build running in another thread."""
+        client = DockerClient(tmp_path)
+        started = threading.Event()
+        real_popen = subprocess.Popen
+
+        # Stands in for docker build: runs until terminated
+        def popen(cmd, **kwargs):
+            process = real_popen(["sleep", "30"], **kwargs)
+            started.set()
+            return process
+
+        errors = []
+
+        def build():
+            try:
+                client.build_image("alice", tmp_path, "Dockerfile")
+            except RuntimeError as e:
+                errors.append(e)
+
+        with patch("subprocess.Popen", side_effect=popen):
+            thread = threading.Thread(target=build)
+            thread.start()
+            assert started.wait(timeout=5)
+
+            client.cancel_build()
+            thread.join(timeout=5)
+
+        assert not thread.is_alive()
+        assert len(errors) == 1
+
+    def test_refuses_later_builds(self, tmp_path):
+        """Should not start a build once cancelled."""
+        client = DockerClient(tmp_path)
+        client.cancel_build()
+
+        with patch("subprocess.Popen") as mock_popen:
+            with pytest.raises(RuntimeError, match="cancelled"):
                 client.build_image("alice", tmp_path, "Dockerfile")
 
+            mock_popen.assert_not_called()
+
+
+class TestReadLines:
+    """Tests for _read_lines function."""
+
+    def _pipe(self, data: bytes):
+        read_fd, write_fd = os.pipe()
+        os.write(write_fd, data)
+        os.close(write_fd)
+        return open(read_fd, "rb", 0)
+
+    def test_splits_lines_across_reads(self):
+        """Should yield each line once, including a final unterminated one."""
+        with self._pipe(b"one\ntwo\r\nthree") as stream:
+            assert list(_read_lines(stream)) == ["one", "two\r", "three"]
+
+    def test_replaces_invalid_utf8(self):
+        """Should not fail on bytes that aren't valid UTF-8."""
+        with self._pipe(b"ok \xff\n") as stream:
+            assert list(_read_lines(stream)) == ["ok \ufffd"]
+
 
 class TestDockerClientRunContainer:
     """Tests for run_container method."""
@@ -106,8 +237,8 @@ class TestDockerClientRunContainer:
         workspace = tmp_path / "workspace"
         workspace.mkdir()
 
-        with patch("subprocess.run") as mock_run:
-            mock_run.return_value = MagicMock(returncode=0)
+        with patch("subprocess.Popen") as mock_popen:
+            mock_popen.return_value.returncode = 0
 
             client.run_container(
                 sandbox_name="alice",
@@ -117,7 +248,7 @@ class TestDockerClientRunContainer:
                 ports={8000: 8001, 5173: 5174},
             )
 
-            call_args = mock_run.call_args[0][0]
+            call_args = mock_popen.call_args[0][0]
             assert "docker" in call_args
             assert "run" in call_args
             assert "-d" in call_args
@@ -126,12 +257,43 @@ class TestDockerClientRunContainer:
             assert expected_container in call_args
             assert "--label" in call_args
 
+    def test_passes_mounts_ports_and_image(self, tmp_path):
+        """Should add mounts and ports before the image and command."""
+        client = DockerClient(tmp_path)
+
+        with patch("subprocess.Popen") as mock_popen:
+            mock_popen.return_value.returncode = 0
+
+            client.run_container(
+                sandbox_name="alice",
+                image="test:latest",
+                workspace_path=tmp_path,
+                workdir="/app",
+                ports={8000: 8001},
+                git_server_path=tmp_path / "git",
+                mounts=[("/host/a", "/a")],
+            )
+
+            call_args = mock_popen.call_args[0][0]
+            assert call_args[-10:] == [
+                "/app",
+                "-v",
+                f"{tmp_path / 'git'}:/repo-origin",
+                "-v",
+                "/host/a:/a",
+                "-p",
+                "8001:8000",
+                "test:latest",
+                "sleep",
+                "infinity",
+            ]
+
     def test_raises_on_run_failure(self, tmp_path):
         """Should raise RuntimeError on run failure."""
         client = DockerClient(tmp_path)
 
-        with patch("subprocess.run") as mock_run:
-            mock_run.return_value = MagicMock(returncode=1, stderr="run error")
+        with patch("subprocess.Popen") as mock_popen:
+            mock_popen.return_value.returncode = 1
 
             with pytest.raises(RuntimeError, match="docker run failed"):
                 client.run_container(
@@ -203,21 +365,260 @@ class TestDockerClientListContainers:
             assert result == []
 
 
+class TestDockerClientListContainerInfo:
+    """Tests for list_sandbox_container_info method."""
+
+    def test_reads_names_and_ports_from_one_ps(self, tmp_path):
+        """Should build container info from a single docker ps call."""
+        client = DockerClient(tmp_path)
+
+        with patch("subprocess.run") as mock_run:
+            mock_run.return_value = MagicMock(
+                returncode=0,
+                stdout=(
+                    "sandbox-ns-a\tfeature/a\t0.0.0.0:8001->8000/tcp, "
+                    "[::]:8001->8000/tcp\n"
+                    "sandbox-ns-b\t\t\n"
+                ),
+            )
+
+            result = client.list_sandbox_container_info()
+
+            mock_run.assert_called_once()
+            assert result == [
+                SandboxContainer("sandbox-ns-a", "feature/a", {8000: 8001}),
+                SandboxContainer("sandbox-ns-b", "b", {}),
+            ]
+
+    def test_returns_empty_on_error(self, tmp_path):
+        """Should return empty list when docker ps fails."""
+        client = DockerClient(tmp_path)
+
+        with patch("subprocess.run") as mock_run:
+            mock_run.return_value = MagicMock(returncode=1, stdout="")
+
+            assert client.list_sandbox_container_info() == []
+
+    def test_caches_listed_containers(self, tmp_path):
+        """Should answer later state, port and name queries from the listing."""
+        client = DockerClient(tmp_path)
+        container = client.container_name("alice")
+
+        with patch("subprocess.run") as mock_run:
+            mock_run.return_value = MagicMock(
+                returncode=0,
+                stdout=f"{container}\talice\t0.0.0.0:8001->8000/tcp\n",
+            )
+
+            containers = client.list_sandbox_container_info()
+            containers[0].ports[9000] = 9001
+
+            assert client.get_container_state("alice") == ContainerState.RUNNING
+            assert client.get_container_ports("alice") == {8000: 8001}
+            assert client.get_sandbox_name_from_container(container) == "alice"
+            mock_run.assert_called_once()
+
+
+class TestDockerDaemonReachable:
+    """Tests for docker_daemon_reachable function."""
+
+    def test_false_when_socket_missing(self, tmp_path, monkeypatch):
+        """Should report an unreachable daemon when the socket doesn't exist."""
+        monkeypatch.setenv("DOCKER_HOST", f"unix://{tmp_path / 'docker.sock'}")
+        assert docker_daemon_reachable() is False
+
+    def test_true_when_socket_listening(self, tmp_path, monkeypatch):
+        """Should report a reachable daemon when the socket accepts connections."""
+        socket_path = tmp_path / "docker.sock"
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(str(socket_path))
+        server.listen(1)
+        monkeypatch.setenv("DOCKER_HOST", f"unix://{socket_path}")
+        try:
+            assert docker_daemon_reachable() is True
+        finally:
+            server.close()
+
+    def test_assumes_remote_hosts_reachable(self, monkeypatch):
+        """Should not probe non-unix docker hosts."""
+        monkeypatch.setenv("DOCKER_HOST", "tcp://127.0.0.1:2375")
+        assert docker_daemon_reachable() is True
+
+
+class TestParsePsPorts:
+    """Tests for parse_ps_ports function."""
+
+    def test_parses_published_ports(self):
+        """Should map container ports to host ports."""
+        assert parse_ps_ports("0.0.0.0:8001->8000/tcp, 0.0.0.0:5174->5173/tcp") == {
+            8000: 8001,
+            5173: 5174,
+        }
+
+    def test_expands_port_ranges(self):
+        """Should expand collapsed port ranges."""
+        assert parse_ps_ports("0.0.0.0:9000-9001->8000-8001/tcp") == {
+            8000: 9000,
+            8001: 9001,
+        }
+
+    def test_skips_unpublished_ports(self):
+        """Should ignore exposed ports without a host mapping."""
+        assert parse_ps_ports("8000/tcp") == {}
+        assert parse_ps_ports("") == {}
+
+
+def _serve_once(socket_path, response: bytes) -> threading.Thread:
+    """Answer one request on a unix socket with a canned HTTP response."""
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(str(socket_path))
+    server.listen(1)
+
+    def serve():
+        conn, _ = server.accept()
+        with conn, server:
+            conn.recv(65536)
+            conn.sendall(response)
+
+    thread = threading.Thread(target=serve)
+    thread.start()
+    return thread
+
+
+class TestDockerApiGet:
+    """Tests for docker_api_get function."""
+
+    def test_decodes_json_body(self, tmp_path):
+        """Should return the decoded body of a 200 response."""
+        socket_path = tmp_path / "docker.sock"
+        thread = _serve_once(
+            socket_path,
+            b'HTTP/1.0 200 OK\r\nContent-Type: application/json\r\n\r\n[{"Id": "abc"}]',
+        )
+
+        assert docker_api_get(str(socket_path), "/containers/json") == [{"Id": "abc"}]
+        thread.join()
+
+    def test_none_on_error_status(self, tmp_path):
+        """Should return None when the daemon answers with an error."""
+        socket_path = tmp_path / "docker.sock"
+        thread = _serve_once(
+            socket_path, b'HTTP/1.0 500 Internal Server Error\r\n\r\n{"message": "x"}'
+        )
+
+        assert docker_api_get(str(socket_path), "/containers/json") is None
+        thread.join()
+
+    def test_none_when_socket_missing(self, tmp_path):
+        """Should return None when nothing listens on the socket."""
+        assert docker_api_get(str(tmp_path / "docker.sock"), "/_ping") is None
+
+
+class TestParseApiPorts:
+    """Tests for parse_api_ports function."""
+
+    def test_parses_published_ports(self):
+        """Should map private ports to public ports, skipping unpublished ones."""
+        ports = [
+            {"IP": "0.0.0.0", "PrivatePort": 8000, "PublicPort": 8001, "Type": "tcp"},
+            {"IP": "::", "PrivatePort": 8000, "PublicPort": 8001, "Type": "tcp"},
+            {"PrivatePort": 9000, "Type": "tcp"},
+        ]
+        assert parse_api_ports(ports) == {8000: 8001}
+
+    def test_handles_missing_ports(self):
+        assert parse_api_ports(None) == {}
+
+
+class TestDockerClientApi:
+    """Tests for DockerClient queries through the Docker Engine API."""
+
+    @pytest.fixture
+    def client(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("DOCKER_HOST", f"unix://{tmp_path / 'docker.sock'}")
+        return DockerClient(tmp_path, use_api=True)
+
+    def test_lists_container_info_without_cli(self, client):
+        """Should read names, labels and ports from the API."""
+        summary = {
+            "Names": ["/sandbox-ns-alice"],
+            "Labels": {"agent-sandbox.name": "alice"},
+            "Ports": [{"PrivatePort": 8000, "PublicPort": 8001, "Type": "tcp"}],
+        }
+        with patch(
+            "agent_sandbox.docker.docker_api_get", return_value=[summary]
+        ) as mock_get:
+            with patch("subprocess.run") as mock_run:
+                containers = client.list_sandbox_container_info()
+
+                mock_run.assert_not_called()
+        assert containers == [
+            SandboxContainer("sandbox-ns-alice", "alice", {8000: 8001})
+        ]
+        path = mock_get.call_args[0][1]
+        assert path.startswith("/containers/json?")
+        assert client.namespace in path
+
+    def test_reads_state_and_ports(self, client):
+        """Should answer state and port queries from the API."""
+        summary = {
+            "Names": [f"/{client.container_name('alice')}"],
+            "State": "running",
+            "Ports": [{"PrivatePort": 8000, "PublicPort": 8001, "Type": "tcp"}],
+        }
+        with patch("agent_sandbox.docker.docker_api_get", return_value=[summary]):
+            with patch("subprocess.run") as mock_run:
+                assert client.get_container_state("alice") == ContainerState.RUNNING
+                assert client.get_container_ports("alice") == {8000: 8001}
+
+                mock_run.assert_not_called()
+
+    def test_not_found_when_api_lists_nothing(self, client):
+        with patch("agent_sandbox.docker.docker_api_get", return_value=[]):
+            assert client.get_container_state("alice") == ContainerState.NOT_FOUND
+
+    def test_falls_back_to_cli(self, client):
+        """Should use the docker CLI when the API request fails."""
+        with patch("agent_sandbox.docker.docker_api_get", return_value=None):
+            with patch("subprocess.run") as mock_run:
+                mock_run.return_value = MagicMock(returncode=0, stdout="sandbox-a\n")
+
+                assert client.list_sandbox_containers() == ["sandbox-a"]
+                mock_run.assert_called_once()
+
+    def test_skips_api_for_remote_hosts(self, tmp_path, monkeypatch):
+        """Should not use the API when docker talks to a remote daemon."""
+        monkeypatch.setenv("DOCKER_HOST", "tcp://127.0.0.1:2375")
+        client = DockerClient(tmp_path, use_api=True)
+
+        with patch("agent_sandbox.docker.docker_api_get") as mock_get:
+            with patch("subprocess.run") as mock_run:
+                mock_run.return_value = MagicMock(returncode=0, stdout="")
+                client.list_sandbox_containers()
+
+            mock_get.assert_not_called()
+
+
 class TestDockerClientGetContainerPorts:
     """Tests for get_container_ports method."""
 
     def test_gets_container_ports(self, tmp_path):
-        """Should get port mappings for a container."""
+        """Should get port mappings for a container from docker inspect."""
         client = DockerClient(tmp_path)
 
         with patch("subprocess.run") as mock_run:
             mock_run.return_value = MagicMock(
                 returncode=0,
-                stdout="8000/tcp -> 0.0.0.0:8001\n5173/tcp -> 0.0.0.0:5174\n",
+                stdout=(
+                    '{"8000/tcp":[{"HostPort":"8001"}],'
+                    '"5173/tcp":[{"HostPort":"5174"}]}\n'
+                ),
             )
 
             result = client.get_container_ports("alice")
             assert result == {8000: 8001, 5173: 5174}
+            call_args = mock_run.call_args[0][0]
+            assert call_args[:2] == ["docker", "inspect"]
 
     def test_returns_empty_on_no_ports(self, tmp_path):
         """Should return empty dict when no port mappings."""
@@ -229,6 +630,44 @@ class TestDockerClientGetContainerPorts:
             result = client.get_container_ports("alice")
             assert result == {}
 
+    def test_skips_unpublished_and_malformed_ports(self, tmp_path):
+        """Should ignore ports without a host binding and junk output."""
+        client = DockerClient(tmp_path)
+
+        with patch("subprocess.run") as mock_run:
+            mock_run.return_value = MagicMock(
+                returncode=0,
+                stdout=(
+                    '{"8000/tcp":[{"HostPort":"8001"}],'
+                    '"9000/tcp":null,"abc/tcp":[{"HostPort":"xyz"}]}\n'
+                ),
+            )
+
+            result = client.get_container_ports("alice")
+            assert result == {8000: 8001}
+
+            mock_run.return_value = MagicMock(returncode=0, stdout="garbage\n")
+            client.clear_cache()
+            assert client.get_container_ports("alice") == {}
+
+
+class TestParseInspectPorts:
+    """Tests for parse_inspect_ports function."""
+
+    def test_parses_published_ports(self):
+        """Should map container ports to the first host binding."""
+        ports = {
+            "8000/tcp": [
+                {"HostIp": "0.0.0.0", "HostPort": "8001"},
+                {"HostIp": "::", "HostPort": "8001"},
+            ],
+            "9000/tcp": None,
+        }
+        assert parse_inspect_ports(ports) == {8000: 8001}
+
+    def test_handles_missing_ports(self):
+        assert parse_inspect_ports(None) == {}
+
 
 class TestDockerClientStopContainer:
     """Tests for stop_container method."""
@@ -248,6 +687,60 @@ class TestDockerClientStopContainer:
             expected_container = f"sandbox-{client.namespace}-alice"
             assert expected_container in call_args
 
+    def test_stops_without_grace_period(self, tmp_path):
+        """Should not wait for the SIGTERM grace period."""
+        client = DockerClient(tmp_path)
+
+        with patch("subprocess.run") as mock_run:
+            mock_run.return_value = MagicMock(returncode=0)
+
+            client.stop_container("alice")
+
+            call_args = mock_run.call_args[0][0]
+            assert call_args[2:4] == ["--time", str(STOP_TIMEOUT)]
+
+    def test_stops_several_containers_in_one_call(self, tmp_path):
+        """Should stop all given containers with a single docker stop."""
+        client = DockerClient(tmp_path)
+
+        with patch("subprocess.Popen") as mock_popen:
+            mock_popen.return_value.stdout = iter(["sandbox-a\n", "sandbox-b\n"])
+
+            stopped = list(client.stop_containers(["sandbox-a", "sandbox-b"]))
+
+            mock_popen.assert_called_once()
+            assert mock_popen.call_args[0][0] == [
+                "docker",
+                "stop",
+                "--time",
+                str(STOP_TIMEOUT),
+                "sandbox-a",
+                "sandbox-b",
+            ]
+            assert stopped == ["sandbox-a", "sandbox-b"]
+
+    def test_stop_containers_reaps_docker_when_abandoned(self, tmp_path):
+        """Should wait for docker even if the caller stops iterating early."""
+        client = DockerClient(tmp_path)
+
+        with patch("subprocess.Popen") as mock_popen:
+            mock_popen.return_value.stdout = iter(["sandbox-a\n", "sandbox-b\n"])
+
+            stopped = client.stop_containers(["sandbox-a", "sandbox-b"])
+            assert next(stopped) == "sandbox-a"
+            stopped.close()
+
+            mock_popen.return_value.communicate.assert_called_once()
+
+    def test_stop_containers_skips_empty(self, tmp_path):
+        """Should not run docker when there is nothing to stop."""
+        client = DockerClient(tmp_path)
+
+        with patch("subprocess.Popen") as mock_popen:
+            assert list(client.stop_containers([])) == []
+
+            mock_popen.assert_not_called()
+
 
 class TestDockerClientRemoveContainer:
     """Tests for remove_container method."""
@@ -287,6 +780,57 @@ class TestDockerClientGetSandboxName:
         assert result == "alice"
 
 
+class TestDockerClientSandboxNameLabel:
+    """Tests for reading the sandbox name label with docker ps."""
+
+    def test_reads_label_without_inspect(self, tmp_path):
+        """Should read the label from docker ps and cache it with the state."""
+        client = DockerClient(tmp_path)
+        container = client.container_name("feature/a")
+
+        with patch("subprocess.run") as mock_run:
+            mock_run.return_value = MagicMock(
+                returncode=0, stdout=f"{container}\trunning\tfeature/a\n"
+            )
+
+            assert client.get_sandbox_name_from_container(container) == "feature/a"
+            assert client.get_container_state("feature/a") == ContainerState.RUNNING
+
+            mock_run.assert_called_once()
+            call_args = mock_run.call_args[0][0]
+            assert call_args[:3] == ["docker", "ps", "-a"]
+
+
+class TestDockerClientShowLogs:
+    """Tests for show_logs method."""
+
+    def test_streams_logs_without_capturing(self, tmp_path):
+        """Should let docker write straight to the terminal."""
+        client = DockerClient(tmp_path)
+
+        with patch("subprocess.run") as mock_run:
+            client.show_logs("alice")
+
+            call_args = mock_run.call_args[0][0]
+            assert call_args == [
+                "docker",
+                "logs",
+                "-f",
+                f"sandbox-{client.namespace}-alice",
+            ]
+            assert "stdout" not in mock_run.call_args.kwargs
+            assert "capture_output" not in mock_run.call_args.kwargs
+
+    def test_does_not_follow_when_disabled(self, tmp_path):
+        """Should omit -f when follow is False."""
+        client = DockerClient(tmp_path)
+
+        with patch("subprocess.run") as mock_run:
+            client.show_logs("alice", follow=False)
+
+            assert "-f" not in mock_run.call_args[0][0]
+
+
 class TestDockerClientShellExists:
     """Tests for DockerClient.shell_exists method."""
 
@@ -328,12 +872,101 @@ class TestDockerClientExecShell:
         """Should raise RuntimeError when shell doesn't exist."""
         client = DockerClient(tmp_path)
 
-        with patch.object(client, "shell_exists", return_value=False):
-            with pytest.raises(RuntimeError) as exc_info:
-                client.exec_shell("alice", "/usr/bin/fish")
+        with patch("agent_sandbox.docker.get_shell_init", return_value=[]):
+            with patch("subprocess.run", return_value=MagicMock(returncode=127)):
+                with patch.object(client, "shell_exists", return_value=False):
+                    with pytest.raises(RuntimeError) as exc_info:
+                        client.exec_shell("alice", "/usr/bin/fish")
+
+        assert "not found in container" in str(exc_info.value)
+        assert "Add 'fish' to apt-get install" in str(exc_info.value)
+        assert "agent-sandbox rm alice" in str(exc_info.value)
+
+    def test_returns_127_from_session_when_shell_exists(self, tmp_path):
+        """Should return 127 from the session itself when the shell exists."""
+        client = DockerClient(tmp_path)
+
+        with patch("agent_sandbox.docker.get_shell_init", return_value=[]):
+            with patch("subprocess.run", return_value=MagicMock(returncode=127)):
+                with patch.object(client, "shell_exists", return_value=True):
+                    assert client.exec_shell("alice", "/bin/zsh") == 127
+
+    def test_checks_shell_in_same_exec(self, tmp_path):
+        """Should check for the shell inside the exec, not beforehand."""
+        client = DockerClient(tmp_path)
+
+        with patch("agent_sandbox.docker.get_shell_init", return_value=[]):
+            with patch(
+                "subprocess.run", return_value=MagicMock(returncode=0)
+            ) as mock_run:
+                with patch.object(client, "shell_exists") as mock_exists:
+                    status = client.exec_shell("alice", "/usr/bin/fish")
+
+        assert status == 0
+        mock_exists.assert_not_called()
+        mock_run.assert_called_once()
+        cmd = mock_run.call_args[0][0]
+        assert cmd[:6] == [
+            "docker",
+            "exec",
+            "-it",
+            client.container_name("alice"),
+            "sh",
+            "-c",
+        ]
+        assert cmd[7:] == ["sh", "/usr/bin/fish"]
+
+    def test_missing_shell_exits_127(self, tmp_path):
+        """Should exit 127 from the exec when the shell is missing."""
+        client = DockerClient(tmp_path)
+
+        with patch("agent_sandbox.docker.get_shell_init", return_value=[]):
+            with patch(
+                "subprocess.run", return_value=MagicMock(returncode=0)
+            ) as mock_run:
+                client.exec_shell("alice", "/nonexistent/shell")
+
+        # Run the script locally in place of the container
+        cmd = mock_run.call_args[0][0]
+        result = subprocess.run(cmd[4:], capture_output=True, text=True)
+
+        assert result.returncode == 127
+
+    def test_init_commands_see_no_arguments(self, tmp_path):
+        """Should not pass the shell on to init commands as $1."""
+        client = DockerClient(tmp_path)
+
+        with patch(
+            "agent_sandbox.docker.get_shell_init", return_value=['echo "[$#:$1]"']
+        ):
+            with patch(
+                "subprocess.run", return_value=MagicMock(returncode=0)
+            ) as mock_run:
+                client.exec_shell("alice", "/bin/true")
 
-            assert "not found in container" in str(exc_info.value)
-            assert "agent-sandbox rm alice" in str(exc_info.value)
+        # Run the script locally in place of the container
+        cmd = mock_run.call_args[0][0]
+        result = subprocess.run(cmd[4:], capture_output=True, text=True)
+
+        assert result.returncode == 0
+        assert result.stdout == "[0:]\n"
+
+    def test_runs_init_commands_before_shell(self, tmp_path):
+        """Should run init commands with bash and then exec the shell."""
+        client = DockerClient(tmp_path)
+
+        with patch(
+            "agent_sandbox.docker.get_shell_init", return_value=["eval $(direnv)"]
+        ):
+            with patch(
+                "subprocess.run", return_value=MagicMock(returncode=0)
+            ) as mock_run:
+                client.exec_shell("alice", "/bin/zsh")
+
+        cmd = mock_run.call_args[0][0]
+        assert cmd[4:6] == ["bash", "-c"]
+        assert cmd[6].endswith('eval $(direnv) && exec "$_agent_sandbox_shell"')
+        assert cmd[8] == "/bin/zsh"
 
 
 class TestDockerClientGetContainerState:
@@ -399,6 +1032,135 @@ class TestDockerClientGetContainerState:
             assert result == ContainerState.NOT_FOUND
 
 
+class TestDockerClientGetContainerStates:
+    """Tests for get_container_states method."""
+
+    def test_queries_all_containers_at_once(self, tmp_path):
+        """Should read every state from one docker ps and cache them."""
+        client = DockerClient(tmp_path)
+        alice = client.container_name("alice")
+        bob = client.container_name("bob")
+
+        with patch("subprocess.run") as mock_run:
+            mock_run.return_value = MagicMock(
+                returncode=0, stdout=f"{alice}\trunning\n{bob}\texited\n"
+            )
+
+            states = client.get_container_states(["alice", "bob", "carol"])
+
+            assert states == {
+                "alice": ContainerState.RUNNING,
+                "bob": ContainerState.STOPPED,
+                "carol": ContainerState.NOT_FOUND,
+            }
+            assert client.get_container_state("bob") == ContainerState.STOPPED
+            mock_run.assert_called_once()
+            call_args = mock_run.call_args[0][0]
+            assert f"name=^{alice}$" in call_args
+            assert f"name=^{bob}$" in call_args
+
+    def test_empty_without_query(self, tmp_path):
+        client = DockerClient(tmp_path)
+
+        with patch("subprocess.run") as mock_run:
+            assert client.get_container_states([]) == {}
+
+            mock_run.assert_not_called()
+
+
+class TestDockerClientQueries:
+    """Tests for how read-only docker commands are run."""
+
+    def test_queries_detach_stdin_and_stderr(self, tmp_path):
+        """Should run queries with stdin and stderr on /dev/null."""
+        client = DockerClient(tmp_path)
+
+        with patch("subprocess.run") as mock_run:
+            mock_run.return_value = MagicMock(returncode=0, stdout="")
+            client.get_container_state("alice")
+
+            kwargs = mock_run.call_args.kwargs
+            assert kwargs["stdin"] == subprocess.DEVNULL
+            assert kwargs["stdout"] == subprocess.PIPE
+            assert kwargs["stderr"] == subprocess.DEVNULL
+            assert "capture_output" not in kwargs
+
+    def test_stop_and_remove_discard_output(self, tmp_path):
+        """Should not open pipes for commands whose output is unused."""
+        client = DockerClient(tmp_path)
+
+        with patch("subprocess.run") as mock_run:
+            mock_run.return_value = MagicMock(returncode=0)
+            client.stop_container("alice")
+            client.remove_container("alice")
+
+            for call in mock_run.call_args_list:
+                assert call.kwargs["stdout"] == subprocess.DEVNULL
+                assert call.kwargs["stderr"] == subprocess.DEVNULL
+
+
+class TestDockerClientMetadataCache:
+    """Tests for caching of per-container docker queries."""
+
+    def _running(self, client):
+        return MagicMock(
+            returncode=0, stdout=f"sandbox-{client.namespace}-alice\trunning\n"
+        )
+
+    def test_reuses_recent_state(self, tmp_path):
+        """Should only query docker once for repeated state checks."""
+        client = DockerClient(tmp_path)
+
+        with patch("subprocess.run") as mock_run:
+            mock_run.return_value = self._running(client)
+
+            assert client.get_container_state("alice") == ContainerState.RUNNING
+            assert client.container_exists("alice")
+
+            mock_run.assert_called_once()
+
+    def test_expires_after_ttl(self, tmp_path):
+        """Should query docker again once the cached result is stale."""
+        client = DockerClient(tmp_path)
+
+        with (
+            patch("subprocess.run") as mock_run,
+            patch("agent_sandbox.docker.time.monotonic") as mock_time,
+        ):
+            mock_run.return_value = self._running(client)
+            mock_time.return_value = 100.0
+            client.get_container_state("alice")
+            mock_time.return_value = 100.0 + METADATA_CACHE_TTL
+            client.get_container_state("alice")
+
+            assert mock_run.call_count == 2
+
+    def test_stop_clears_cache(self, tmp_path):
+        """Should query docker again after stopping a container."""
+        client = DockerClient(tmp_path)
+
+        with patch("subprocess.run") as mock_run:
+            mock_run.return_value = self._running(client)
+            client.get_container_state("alice")
+            client.stop_container("alice")
+            mock_run.return_value = MagicMock(returncode=0, stdout="")
+
+            assert client.get_container_state("alice") == ContainerState.NOT_FOUND
+
+    def test_ports_returns_copy(self, tmp_path):
+        """Should not let callers modify the cached port mapping."""
+        client = DockerClient(tmp_path)
+
+        with patch("subprocess.run") as mock_run:
+            mock_run.return_value = MagicMock(
+                returncode=0, stdout='{"8000/tcp":[{"HostPort":"8001"}]}\n'
+            )
+            client.get_container_ports("alice")[9000] = 9001
+
+            assert client.get_container_ports("alice") == {8000: 8001}
+            mock_run.assert_called_once()
+
+
 class TestDockerClientRestartContainer:
     """Tests for restart_container method."""
 
@@ -406,12 +1168,12 @@ class TestDockerClientRestartContainer:
         """Should restart a stopped container."""
         client = DockerClient(tmp_path)
 
-        with patch("subprocess.run") as mock_run:
-            mock_run.return_value = MagicMock(returncode=0)
+        with patch("subprocess.Popen") as mock_popen:
+            mock_popen.return_value.returncode = 0
 
             client.restart_container("alice")
 
-            call_args = mock_run.call_args[0][0]
+            call_args = mock_popen.call_args[0][0]
             assert "docker" in call_args
             assert "start" in call_args
             expected_container = f"sandbox-{client.namespace}-alice"
@@ -421,8 +1183,8 @@ class TestDockerClientRestartContainer:
         """Should raise RuntimeError on restart failure."""
         client = DockerClient(tmp_path)
 
-        with patch("subprocess.run") as mock_run:
-            mock_run.return_value = MagicMock(returncode=1, stderr="start error")
+        with patch("subprocess.Popen") as mock_popen:
+            mock_popen.return_value.returncode = 1
 
             with pytest.raises(RuntimeError, match="docker start failed"):
                 client.restart_container("alice")
@@ -431,6 +1193,26 @@ class TestDockerClientRestartContainer:
 class TestDockerClientStartContainerWithState:
     """Tests for start_container handling of container states."""
 
+    def test_uses_provided_state(self, tmp_path):
+        """Should not query the container state when it is passed in."""
+        client = DockerClient(tmp_path)
+
+        with patch.object(client, "get_container_state") as mock_state:
+            with patch.object(client, "restart_container") as mock_restart:
+                client.start_container(
+                    sandbox_name="alice",
+                    context_path=tmp_path,
+                    dockerfile="Dockerfile",
+                    image=None,
+                    workspace_path=tmp_path,
+                    workdir="/app",
+                    ports={},
+                    container_state=ContainerState.STOPPED,
+                )
+
+                mock_state.assert_not_called()
+                mock_restart.assert_called_once_with("alice")
+
     def test_does_nothing_when_running(self, tmp_path):
         """Should do nothing when container is already running."""
         client = DockerClient(tmp_path)
@@ -498,3 +1280,174 @@ class TestDockerClientStartContainerWithState:
 
                     mock_build.assert_called_once()
                     mock_run.assert_called_once()
+
+    def test_skips_build_when_image_is_current(self, tmp_path):
+        """Should reuse the image when it was built from the same Dockerfile."""
+        client = DockerClient(tmp_path)
+        (tmp_path / "Dockerfile").write_text("FROM alpine\n")
+
+        with patch.object(
+            client, "get_container_state", return_value=ContainerState.NOT_FOUND
+        ):
+            with patch.object(client, "image_is_current", return_value=True):
+                with patch.object(client, "build_image") as mock_build:
+                    with patch.object(client, "run_container") as mock_run:
+                        client.start_container(
+                            sandbox_name="alice",
+                            context_path=tmp_path,
+                            dockerfile="Dockerfile",
+                            image=None,
+                            workspace_path=tmp_path,
+                            workdir="/app",
+                            ports={},
+                        )
+
+                        mock_build.assert_not_called()
+                        mock_run.assert_called_once()
+
+    def test_uses_prepared_image(self, tmp_path):
+        """Should run the given image without building when one is passed."""
+        client = DockerClient(tmp_path)
+
+        with patch.object(client, "build_image") as mock_build:
+            with patch.object(client, "run_container") as mock_run:
+                client.start_container(
+                    sandbox_name="alice",
+                    context_path=tmp_path,
+                    dockerfile="Dockerfile",
+                    image=None,
+                    workspace_path=tmp_path,
+                    workdir="/app",
+                    ports={},
+                    container_state=ContainerState.NOT_FOUND,
+                    run_image="prebuilt",
+                )
+
+                mock_build.assert_not_called()
+                assert mock_run.call_args.kwargs["image"] == "prebuilt"
+
+    def test_labels_build_with_dockerfile_hash(self, tmp_path):
+        """Should record the Dockerfile hash when the image is rebuilt."""
+        client = DockerClient(tmp_path)
+        (tmp_path / "Dockerfile").write_text("FROM alpine\n")
+        build_hash = dockerfile_build_hash(tmp_path / "Dockerfile")
+
+        with patch.object(
+            client, "get_container_state", return_value=ContainerState.NOT_FOUND
+        ):
+            with patch.object(client, "image_is_current", return_value=False):
+                with patch.object(client, "build_image") as mock_build:
+                    with patch.object(client, "run_container"):
+                        client.start_container(
+                            sandbox_name="alice",
+                            context_path=tmp_path,
+                            dockerfile="Dockerfile",
+                            image=None,
+                            workspace_path=tmp_path,
+                            workdir="/app",
+                            ports={},
+                        )
+
+                        assert mock_build.call_args[1]["build_hash"] == build_hash
+
+
+class TestDockerfileBuildHash:
+    """Tests for dockerfile_build_hash function."""
+
+    def test_hash_changes_with_content(self, tmp_path):
+        dockerfile = tmp_path / "Dockerfile"
+        dockerfile.write_text("FROM alpine\n")
+        first = dockerfile_build_hash(dockerfile)
+        dockerfile.write_text("FROM ubuntu\n")
+
+        assert first is not None
+        assert dockerfile_build_hash(dockerfile) != first
+
+    def test_allows_copy_from_other_image(self, tmp_path):
+        dockerfile = tmp_path / "Dockerfile"
+        dockerfile.write_text("FROM alpine\nCOPY --from=uv:latest /uv /bin/\n")
+
+        assert dockerfile_build_hash(dockerfile) is not None
+
+    def test_none_when_build_reads_context(self, tmp_path):
+        dockerfile = tmp_path / "Dockerfile"
+        dockerfile.write_text("FROM alpine\ncopy setup.sh /tmp/\n")
+
+        assert dockerfile_build_hash(dockerfile) is None
+
+    def test_none_when_missing(self, tmp_path):
+        assert dockerfile_build_hash(tmp_path / "Dockerfile") is None
+
+    def test_joins_continuation_lines(self, tmp_path):
+        """Should see a COPY whose source is on a continuation line."""
+        dockerfile = tmp_path / "Dockerfile"
+        dockerfile.write_text(
+            "FROM alpine\nRUN apk add git \\\n    && echo done\n"
+            "COPY \\\n  # the source\n  setup.sh /tmp/\n"
+        )
+
+        assert dockerfile_build_hash(dockerfile) is None
+
+    def test_allows_copy_from_on_continuation_line(self, tmp_path):
+        dockerfile = tmp_path / "Dockerfile"
+        dockerfile.write_text("FROM alpine\nCOPY \\\n  --from=uv:latest /uv /bin/\n")
+
+        assert dockerfile_build_hash(dockerfile) is not None
+
+    def test_honors_escape_directive(self, tmp_path):
+        """Should join lines on the escape character the Dockerfile sets."""
+        dockerfile = tmp_path / "Dockerfile"
+        dockerfile.write_text("# escape=`\nFROM alpine\nRUN echo `\nCOPY a /b\n")
+
+        assert dockerfile_build_hash(dockerfile) is not None
+
+    def test_none_for_onbuild(self, tmp_path):
+        dockerfile = tmp_path / "Dockerfile"
+        dockerfile.write_text("FROM alpine\nONBUILD COPY . /app\n")
+
+        assert dockerfile_build_hash(dockerfile) is None
+
+    def test_none_for_heredoc(self, tmp_path):
+        """Should not try to parse heredoc bodies."""
+        dockerfile = tmp_path / "Dockerfile"
+        dockerfile.write_text("FROM alpine\nRUN <<EOF\necho hi\nEOF\n")
+
+        assert dockerfile_build_hash(dockerfile) is None
+
+    def test_none_for_context_bind_mount(self, tmp_path):
+        dockerfile = tmp_path / "Dockerfile"
+        dockerfile.write_text("FROM alpine\nRUN --mount=target=/src make -C /src\n")
+
+        assert dockerfile_build_hash(dockerfile) is None
+
+    def test_allows_cache_and_stage_mounts(self, tmp_path):
+        dockerfile = tmp_path / "Dockerfile"
+        dockerfile.write_text(
+            "FROM alpine\n"
+            "RUN --mount=type=cache,target=/var/cache/apk apk add git\n"
+            "RUN --mount=type=bind,from=uv:latest,target=/uv ls /uv\n"
+        )
+
+        assert dockerfile_build_hash(dockerfile) is not None
+
+
+class TestDockerClientImageIsCurrent:
+    """Tests for image_is_current method."""
+
+    def test_matches_build_hash_label(self, tmp_path):
+        client = DockerClient(tmp_path)
+
+        with patch("subprocess.run") as mock_run:
+            mock_run.return_value = MagicMock(returncode=0, stdout="abc123\n")
+
+            assert client.image_is_current("alice", "abc123")
+            assert not client.image_is_current("alice", "def456")
+            assert client.image_name("alice") in mock_run.call_args[0][0]
+
+    def test_false_when_image_missing(self, tmp_path):
+        client = DockerClient(tmp_path)
+
+        with patch("subprocess.run") as mock_run:
+            mock_run.return_value = MagicMock(returncode=1, stdout="")
+
+            assert not client.image_is_current("alice", "abc123")
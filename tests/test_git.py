@@ -1,7 +1,9 @@
 """Tests for Git client."""
 
+import subprocess
 from unittest.mock import MagicMock, patch
 
+import pytest
 
 from agent_sandbox.git import GitClient, CONTAINER_GIT_SERVER
 
@@ -14,6 +16,18 @@ class TestGitClient:
         client = GitClient(tmp_path)
         assert client.project_root == tmp_path
 
+    def test_init_accepts_string_root(self, tmp_path):
+        """Should convert a string project root to a Path."""
+        client = GitClient(str(tmp_path))
+        assert client.project_root == tmp_path
+        assert client.sandboxes_dir == tmp_path / ".sandboxes"
+
+    def test_dirs_are_computed_once(self, tmp_path):
+        """Should reuse the same Path objects across lookups."""
+        client = GitClient(tmp_path)
+        assert client.sandboxes_dir is client.sandboxes_dir
+        assert client.git_server_path is client.git_server_path
+
     def test_git_server_path(self, tmp_path):
         """Should return correct git server path."""
         client = GitClient(tmp_path)
@@ -77,6 +91,23 @@ class TestGitClientCreateSandbox:
             # Should have called git clone, git checkout, and git remote set-url
             assert mock_run.call_count >= 3
 
+    def test_discards_unused_output(self, tmp_path):
+        """Should send output nobody reads to /dev/null instead of pipes."""
+        client = GitClient(tmp_path)
+        client.git_server_path.mkdir(parents=True)
+
+        with patch("subprocess.run") as mock_run:
+            mock_run.return_value = MagicMock(returncode=0)
+
+            client.create_sandbox("alice")
+
+            for call in mock_run.call_args_list:
+                assert call.kwargs["stdout"] is subprocess.DEVNULL
+                assert "capture_output" not in call.kwargs
+                # Only the push's errors are read, for its failure message
+                if "push" not in call.args[0]:
+                    assert call.kwargs["stderr"] is subprocess.DEVNULL
+
     def test_creates_sandbox_with_custom_branch(self, tmp_path):
         """Should create sandbox with custom branch name."""
         client = GitClient(tmp_path)
@@ -192,21 +223,33 @@ class TestGitClientCreateSandbox:
 
             client.create_sandbox("alice")
 
-            # Check that git config commands were called
+            # Settings are passed to git clone rather than separate git config runs
             calls = [call[0][0] for call in mock_run.call_args_list]
+            clone_call = next(call for call in calls if "clone" in call)
+            assert "user.name=John Doe" in clone_call
+            assert "user.email=john@example.com" in clone_call
+            assert not any("config" in call for call in calls)
+
+    def test_clone_keeps_config_settings(self, temp_project_dir, mocker):
+        """Should persist clone -c settings in the sandbox repo."""
+        client = GitClient(temp_project_dir)
+        mocker.patch("agent_sandbox.git.get_git_name", return_value="John Doe")
+        mocker.patch("agent_sandbox.git.get_git_email", return_value=None)
 
-            # Should have calls for git clone, checkout, set-url, and config
-            config_calls = [
-                call for call in calls if "config" in call and "user.name" in call
-            ]
-            assert len(config_calls) == 1
-            assert "John Doe" in config_calls[0]
+        sandbox_path = client.create_sandbox("alice")
 
-            config_calls = [
-                call for call in calls if "config" in call and "user.email" in call
-            ]
-            assert len(config_calls) == 1
-            assert "john@example.com" in config_calls[0]
+        def git_config(key):
+            return subprocess.run(
+                ["git", "config", "--local", key],
+                cwd=sandbox_path,
+                capture_output=True,
+                text=True,
+            ).stdout.strip()
+
+        assert git_config("push.default") == "current"
+        assert git_config("user.name") == "John Doe"
+        assert git_config("remote.origin.url") == CONTAINER_GIT_SERVER
+        assert client.get_current_branch("alice") == "sandbox/alice"
 
     def test_skips_git_config_when_not_provided(self, tmp_path, mocker):
         """Should skip git config when not configured."""
@@ -222,14 +265,9 @@ class TestGitClientCreateSandbox:
 
             client.create_sandbox("alice")
 
-            # Check that no git config commands were called
-            calls = [call[0][0] for call in mock_run.call_args_list]
-            config_calls = [
-                call
-                for call in calls
-                if "config" in call and ("user.name" in call or "user.email" in call)
-            ]
-            assert len(config_calls) == 0
+            # Check that no git user settings were passed
+            calls = [" ".join(call[0][0]) for call in mock_run.call_args_list]
+            assert not any("user.name" in c or "user.email" in c for c in calls)
 
 
 class TestGitClientRemoveSandbox:
@@ -260,27 +298,59 @@ class TestGitClientGetCurrentBranch:
     def test_gets_current_branch(self, tmp_path):
         """Should get current branch name."""
         client = GitClient(tmp_path)
-        # Create sandbox directory
-        sandbox_path = tmp_path / ".sandboxes" / "alice"
-        sandbox_path.mkdir(parents=True)
+        git_dir = tmp_path / ".sandboxes" / "alice" / ".git"
+        git_dir.mkdir(parents=True)
+        (git_dir / "HEAD").write_text("ref: refs/heads/sandbox/alice\n")
 
         with patch("subprocess.run") as mock_run:
-            mock_run.return_value = MagicMock(returncode=0, stdout="sandbox/alice\n")
-
             result = client.get_current_branch("alice")
 
             assert result == "sandbox/alice"
+            # Read from the HEAD file without starting git
+            mock_run.assert_not_called()
+
+    def test_matches_git_in_real_clone(self, temp_project_dir):
+        """Should report the same branch as git does."""
+        client = GitClient(temp_project_dir)
+        sandbox_path = client.create_sandbox("alice", branch="feature/login")
+
+        expected = subprocess.run(
+            ["git", "branch", "--show-current"],
+            cwd=sandbox_path,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+
+        assert client.get_current_branch("alice") == expected == "feature/login"
+
+    def test_follows_gitdir_file(self, tmp_path):
+        """Should read HEAD from the git dir a .git file points to."""
+        client = GitClient(tmp_path)
+        sandbox_path = tmp_path / ".sandboxes" / "alice"
+        sandbox_path.mkdir(parents=True)
+        real_git_dir = tmp_path / "gitdirs" / "alice"
+        real_git_dir.mkdir(parents=True)
+        (real_git_dir / "HEAD").write_text("ref: refs/heads/sandbox/alice\n")
+        (sandbox_path / ".git").write_text("gitdir: ../../gitdirs/alice\n")
+
+        assert client.get_current_branch("alice") == "sandbox/alice"
+
+    def test_returns_detached_for_detached_head(self, tmp_path):
+        """Should return 'detached' when HEAD is a commit, not a branch."""
+        client = GitClient(tmp_path)
+        git_dir = tmp_path / ".sandboxes" / "alice" / ".git"
+        git_dir.mkdir(parents=True)
+        (git_dir / "HEAD").write_text("0123456789abcdef0123456789abcdef01234567\n")
+
+        assert client.get_current_branch("alice") == "detached"
 
     def test_returns_detached_on_failure(self, tmp_path):
         """Should return 'detached' on failure."""
         client = GitClient(tmp_path)
 
-        with patch("subprocess.run") as mock_run:
-            mock_run.return_value = MagicMock(returncode=1, stdout="")
-
-            result = client.get_current_branch("alice")
+        result = client.get_current_branch("alice")
 
-            assert result == "detached"
+        assert result == "detached"
 
 
 class TestGitClientMergeSandbox:
@@ -335,6 +405,38 @@ class TestGitClientMergeSandbox:
             assert success is False
             assert "conflict" in message.lower()
 
+    def test_merge_conflict_in_real_repo(self, temp_project_dir):
+        """Should report conflicts from MERGE_HEAD without running git status."""
+        client = GitClient(temp_project_dir)
+        sandbox_path = client.create_sandbox("alice")
+
+        def commit(cwd, text):
+            (cwd / "README.md").write_text(text)
+            subprocess.run(
+                ["git", "-c", "user.name=Test", "-c", "user.email=t@t", "commit"]
+                + ["-am", text],
+                cwd=cwd,
+                capture_output=True,
+                check=True,
+            )
+
+        commit(sandbox_path, "sandbox change")
+        subprocess.run(
+            ["git", "push", str(client.git_server_path), "HEAD"],
+            cwd=sandbox_path,
+            capture_output=True,
+            check=True,
+        )
+        commit(temp_project_dir, "host change")
+
+        real_run = subprocess.run
+        with patch("subprocess.run", side_effect=real_run) as mock_run:
+            success, message = client.merge_sandbox("alice")
+
+        assert success is False
+        assert "Merge conflicts detected" in message
+        assert not any("status" in call[0][0] for call in mock_run.call_args_list)
+
     def test_merge_with_sandbox_prefix(self, tmp_path):
         """Should handle branch name with sandbox/ prefix.
 
@@ -369,3 +471,161 @@ class TestGitClientMergeSandbox:
             fetch_call = mock_run.call_args_list[0]
             fetch_cmd = fetch_call[0][0]
             assert "sandbox/alice" in fetch_cmd
+
+
+class TestGitClientBranchExistsInGitServer:
+    """Tests for branch_exists_in_git_server method."""
+
+    def test_finds_loose_and_packed_refs(self, temp_project_dir):
+        """Should find branches whether their refs are loose or packed."""
+        client = GitClient(temp_project_dir)
+        client.ensure_git_server()
+        server = client.git_server_path
+
+        def git(*args):
+            subprocess.run(["git", *args], cwd=server, capture_output=True, check=True)
+
+        git("branch", "sandbox/alice")
+        git("pack-refs", "--all")
+        git("branch", "sandbox/bob")
+
+        with patch("subprocess.run") as mock_run:
+            assert client.branch_exists_in_git_server("sandbox/alice")
+            assert client.branch_exists_in_git_server("sandbox/bob")
+            assert not client.branch_exists_in_git_server("sandbox/carol")
+            assert not client.branch_exists_in_git_server("sandbox")
+
+            mock_run.assert_not_called()
+
+    def test_sees_branches_pushed_later(self, temp_project_dir):
+        """Should see a branch pushed after an earlier check."""
+        client = GitClient(temp_project_dir)
+        client.ensure_git_server()
+
+        assert not client.branch_exists_in_git_server("sandbox/alice")
+
+        subprocess.run(
+            ["git", "branch", "sandbox/alice"],
+            cwd=client.git_server_path,
+            capture_output=True,
+            check=True,
+        )
+
+        assert client.branch_exists_in_git_server("sandbox/alice")
+
+    def test_uses_git_for_reftable(self, tmp_path):
+        """Should ask git when refs are stored in the reftable format."""
+        (tmp_path / ".git-server" / "reftable").mkdir(parents=True)
+        client = GitClient(tmp_path)
+
+        with patch("subprocess.run") as mock_run:
+            mock_run.return_value = MagicMock(returncode=0)
+
+            assert client.branch_exists_in_git_server("main")
+            assert mock_run.call_args[0][0][:2] == ["git", "show-ref"]
+
+    def test_false_without_git_server(self, tmp_path):
+        client = GitClient(tmp_path)
+
+        with patch("subprocess.run") as mock_run:
+            assert not client.branch_exists_in_git_server("main")
+
+            mock_run.assert_not_called()
+
+
+class TestGitClientSyncToGitServer:
+    """Tests for sync_to_git_server method."""
+
+    def test_skips_sync_after_creating_server(self, temp_project_dir):
+        """Should not push to a git server it has just cloned."""
+        client = GitClient(temp_project_dir)
+        client.ensure_git_server()
+
+        with patch("subprocess.run") as mock_run:
+            mock_run.return_value = MagicMock(returncode=0, stderr="")
+            client.sync_to_git_server()
+            mock_run.assert_not_called()
+
+            # Only the first sync is skipped
+            client.sync_to_git_server()
+            mock_run.assert_called_once()
+            assert "push" in mock_run.call_args[0][0]
+
+    def test_pushes_only_server_head_branch(self, temp_project_dir):
+        """Should update the branch sandboxes clone and no other."""
+        client = GitClient(temp_project_dir)
+        client.ensure_git_server()
+        client.sync_to_git_server()
+
+        def git(*args, cwd=temp_project_dir):
+            return subprocess.run(
+                ["git", *args], cwd=cwd, capture_output=True, text=True, check=True
+            ).stdout.strip()
+
+        default = git("symbolic-ref", "--short", "HEAD")
+        git("commit", "--allow-empty", "-m", "second")
+        git("branch", "other")
+
+        client.sync_to_git_server()
+
+        server = client.git_server_path
+        assert git("rev-parse", default, cwd=server) == git("rev-parse", "HEAD")
+        assert "refs/heads/other" not in git("for-each-ref", cwd=server)
+
+    def test_pushes_all_when_server_head_unreadable(self, tmp_path):
+        """Should fall back to pushing every branch."""
+        client = GitClient(tmp_path)
+        client.git_server_path.mkdir()
+
+        with patch("subprocess.run") as mock_run:
+            mock_run.return_value = MagicMock(returncode=0, stderr="")
+            client.sync_to_git_server()
+
+            assert "--all" in mock_run.call_args[0][0]
+
+    def test_pushes_requested_branch(self, temp_project_dir):
+        """Should also update the branch the sandbox was asked for."""
+        client = GitClient(temp_project_dir)
+        client.ensure_git_server()
+        client.sync_to_git_server()
+
+        def git(*args, cwd=temp_project_dir):
+            return subprocess.run(
+                ["git", *args], cwd=cwd, capture_output=True, text=True, check=True
+            ).stdout.strip()
+
+        git("branch", "feature")
+        git("branch", "other")
+
+        client.sync_to_git_server("feature")
+
+        server = client.git_server_path
+        assert git("rev-parse", "feature", cwd=server) == git("rev-parse", "feature")
+        assert "refs/heads/other" not in git("for-each-ref", cwd=server)
+
+    def test_skips_requested_branch_missing_locally(self, temp_project_dir):
+        """Should not try to push a branch the main repo doesn't have."""
+        client = GitClient(temp_project_dir)
+        client.ensure_git_server()
+        client.sync_to_git_server()
+
+        client.sync_to_git_server("sandbox/alice")
+
+        result = subprocess.run(
+            ["git", "rev-parse", "--verify", "--quiet", "refs/heads/sandbox/alice"],
+            cwd=client.git_server_path,
+        )
+        assert result.returncode != 0
+
+    def test_raises_when_push_fails(self, tmp_path):
+        """Should raise RuntimeError with git's error when the push fails."""
+        client = GitClient(tmp_path)
+        client.git_server_path.mkdir()
+
+        with patch("subprocess.run") as mock_run:
+            mock_run.return_value = MagicMock(returncode=1, stderr="rejected\n")
+
+            with pytest.raises(RuntimeError) as exc_info:
+                client.sync_to_git_server()
+
+        assert "git push to git server failed: rejected" in str(exc_info.value)
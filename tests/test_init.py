@@ -1,9 +1,11 @@
 """Tests for init module."""
 
 import subprocess
+from unittest.mock import patch
 
 
-from agent_sandbox.init import find_git_root, create_devcontainer
+from agent_sandbox.init import clear_git_root_cache, create_devcontainer, find_git_root
+from agent_sandbox.utils import find_project_root
 
 
 class TestFindGitRoot:
@@ -26,16 +28,44 @@ class TestFindGitRoot:
         result = find_git_root(tmp_path)
         assert result is None
 
+    def test_memoizes_result(self, tmp_path):
+        """Should only run git once per start path."""
+        subprocess.run(["git", "init"], cwd=tmp_path, capture_output=True, check=True)
+
+        with patch("subprocess.run", wraps=subprocess.run) as mock_run:
+            assert find_git_root(tmp_path) == tmp_path
+            assert find_git_root(tmp_path) == tmp_path
+
+            mock_run.assert_called_once()
+
+    def test_clear_cache_sees_new_repo(self, tmp_path):
+        """Should find a repo created after a cached miss once cleared."""
+        assert find_git_root(tmp_path) is None
+        subprocess.run(["git", "init"], cwd=tmp_path, capture_output=True, check=True)
+        assert find_git_root(tmp_path) is None
+
+        clear_git_root_cache()
+        assert find_git_root(tmp_path) == tmp_path
+
 
 class TestCreateDevcontainer:
     """Tests for create_devcontainer function."""
 
+    def test_clears_project_root_cache(self, tmp_path):
+        """Should make the new devcontainer visible to find_project_root."""
+        assert find_project_root(tmp_path) is None
+
+        create_devcontainer(tmp_path)
+
+        assert find_project_root(tmp_path) == tmp_path
+
     def test_creates_devcontainer_files(self, tmp_path):
         """Should create .devcontainer directory with Dockerfile and devcontainer.json."""
-        create_devcontainer(tmp_path)
+        result = create_devcontainer(tmp_path)
 
         devcontainer_dir = tmp_path / ".devcontainer"
         assert devcontainer_dir.exists()
+        assert result == devcontainer_dir / "devcontainer.json"
 
         dockerfile = devcontainer_dir / "Dockerfile"
         assert dockerfile.exists()
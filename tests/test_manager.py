@@ -1,10 +1,12 @@
 """Tests for SandboxManager."""
 
+import threading
 from pathlib import Path
 from unittest.mock import MagicMock
 
 import pytest
 
+from agent_sandbox.docker import ContainerState, SandboxContainer
 from agent_sandbox.manager import SandboxManager, SandboxInfo
 
 
@@ -77,6 +79,27 @@ class TestSandboxManager:
         with pytest.raises(ValueError, match="Could not find devcontainer.json"):
             SandboxManager(tmp_path)
 
+    def test_init_with_devcontainer_file(self, tmp_path):
+        """Should derive project root from a known devcontainer.json."""
+        devcontainer_dir = tmp_path / ".devcontainer"
+        devcontainer_dir.mkdir()
+        devcontainer = devcontainer_dir / "devcontainer.json"
+        devcontainer.write_text('{"forwardPorts": [8000]}')
+
+        manager = SandboxManager(devcontainer_file=devcontainer)
+        assert manager.project_root == tmp_path
+        assert manager.devcontainer_file == devcontainer
+        assert manager._base_ports == [8000]
+
+    def test_docker_client_created_lazily(self, tmp_path):
+        """Should not create the Docker client until it is used."""
+        devcontainer = tmp_path / ".devcontainer.json"
+        devcontainer.write_text("{}")
+
+        manager = SandboxManager(devcontainer_file=devcontainer)
+        assert "_docker" not in manager.__dict__
+        assert manager._docker.project_root == tmp_path
+
 
 class TestSandboxManagerPortCalculation:
     """Tests for port offset calculation."""
@@ -108,7 +131,7 @@ class TestSandboxManagerPortCalculation:
 
         manager = SandboxManager(tmp_path)
         manager._docker = MagicMock()
-        manager._docker.list_sandbox_containers.return_value = []
+        manager._docker.list_sandbox_container_info.return_value = []
 
         offset = manager._get_next_port_offset()
         assert offset == 0
@@ -140,14 +163,11 @@ class TestSandboxManagerPortCalculation:
 
         manager = SandboxManager(tmp_path)
         manager._docker = MagicMock()
-        manager._docker.list_sandbox_containers.return_value = [
-            "sandbox-alice",
-            "sandbox-bob",
-        ]
-        manager._docker.get_sandbox_name_from_container.side_effect = ["alice", "bob"]
-        manager._docker.get_container_ports.side_effect = [
-            {8000: 8000},  # alice has offset 0
-            {8000: 8001},  # bob has offset 1
+        manager._docker.list_sandbox_container_info.return_value = [
+            # alice has offset 0
+            SandboxContainer("sandbox-alice", "alice", {8000: 8000}),
+            # bob has offset 1
+            SandboxContainer("sandbox-bob", "bob", {8000: 8001}),
         ]
 
         offset = manager._get_next_port_offset()
@@ -184,8 +204,9 @@ class TestSandboxManagerStart:
 
         manager = SandboxManager(tmp_path)
         manager._docker = MagicMock()
-        manager._docker.list_sandbox_containers.return_value = []
-        manager._docker.container_exists.return_value = False
+        manager._docker.list_sandbox_container_info.return_value = []
+        manager._docker.get_container_state.return_value = ContainerState.NOT_FOUND
+        manager._docker.prepare_image.return_value = "sandbox-test-alice"
         manager._git = MagicMock()
         manager._git.create_sandbox.return_value = tmp_path / ".sandboxes" / "alice"
         manager._git.git_server_path = tmp_path / ".git-server"
@@ -198,6 +219,9 @@ class TestSandboxManagerStart:
         manager._git.ensure_git_server.assert_called_once()
         manager._git.create_sandbox.assert_called_once_with("alice", None)
         manager._docker.start_container.assert_called_once()
+        # The image was prepared up front, so start_container doesn't build
+        kwargs = manager._docker.start_container.call_args.kwargs
+        assert kwargs["run_image"] == "sandbox-test-alice"
 
     def test_start_skips_if_already_running(self, tmp_path):
         """Should skip start if sandbox already running."""
@@ -226,7 +250,7 @@ class TestSandboxManagerStart:
 
         manager = SandboxManager(tmp_path)
         manager._docker = MagicMock()
-        manager._docker.container_exists.return_value = True
+        manager._docker.get_container_state.return_value = ContainerState.RUNNING
         manager._docker.get_container_ports.return_value = {8000: 8001}
         manager._git = MagicMock()
         manager._git.get_current_branch.return_value = "sandbox/alice"
@@ -238,6 +262,142 @@ class TestSandboxManagerStart:
         manager._docker.start_container.assert_not_called()
         assert result.name == "alice"
 
+    def test_start_reuses_known_state(self, tmp_path):
+        """Should not query Docker again when the container state is passed in."""
+        devcontainer = tmp_path / ".devcontainer.json"
+        devcontainer.write_text('{"forwardPorts": [8000]}')
+
+        manager = SandboxManager(devcontainer_file=devcontainer)
+        manager._docker = MagicMock()
+        manager._docker.list_sandbox_container_info.return_value = []
+        manager._git = MagicMock()
+        manager._git.create_sandbox.return_value = tmp_path / ".sandboxes" / "alice"
+
+        manager.start("alice", state=ContainerState.STOPPED)
+
+        manager._docker.get_container_state.assert_not_called()
+        kwargs = manager._docker.start_container.call_args.kwargs
+        assert kwargs["container_state"] == ContainerState.STOPPED
+
+    def test_start_prepares_image_while_cloning(self, tmp_path):
+        """Should build the image for a new container alongside the clone."""
+        devcontainer = tmp_path / ".devcontainer.json"
+        devcontainer.write_text('{"forwardPorts": [8000]}')
+
+        manager = SandboxManager(devcontainer_file=devcontainer)
+        manager._docker = MagicMock()
+        manager._docker.list_sandbox_container_info.return_value = []
+        manager._git = MagicMock()
+        manager._git.create_sandbox.return_value = tmp_path / ".sandboxes" / "alice"
+
+        started = threading.Event()
+        cloned = threading.Event()
+
+        def prepare_image(*args, **kwargs):
+            started.set()
+            # Blocks until the clone is done, so both must overlap
+            assert cloned.wait(timeout=5)
+            return "built-image"
+
+        def create_sandbox(name, branch):
+            assert started.wait(timeout=5)
+            cloned.set()
+            return tmp_path / ".sandboxes" / name
+
+        manager._docker.prepare_image.side_effect = prepare_image
+        manager._git.create_sandbox.side_effect = create_sandbox
+
+        manager.start("alice", state=ContainerState.NOT_FOUND)
+
+        kwargs = manager._docker.start_container.call_args.kwargs
+        assert kwargs["run_image"] == "built-image"
+
+    def test_start_cancels_build_when_clone_fails(self, tmp_path):
+        """Should stop the image build instead of waiting for it on error."""
+        devcontainer = tmp_path / ".devcontainer.json"
+        devcontainer.write_text('{"forwardPorts": [8000]}')
+
+        manager = SandboxManager(devcontainer_file=devcontainer)
+        manager._docker = MagicMock()
+        manager._git = MagicMock()
+
+        cancelled = threading.Event()
+
+        def prepare_image(*args, **kwargs):
+            # A build that only ends when cancelled
+            assert cancelled.wait(timeout=5)
+            raise RuntimeError("docker build cancelled")
+
+        manager._docker.prepare_image.side_effect = prepare_image
+        manager._docker.cancel_build.side_effect = cancelled.set
+        manager._git.create_sandbox.side_effect = RuntimeError("clone failed")
+
+        with pytest.raises(RuntimeError, match="clone failed"):
+            manager.start("alice", state=ContainerState.NOT_FOUND)
+
+        manager._docker.cancel_build.assert_called_once()
+        manager._docker.start_container.assert_not_called()
+
+    def test_start_reports_build_progress_from_caller_thread(self, tmp_path):
+        """Should report image progress from the calling thread only."""
+        devcontainer = tmp_path / ".devcontainer.json"
+        devcontainer.write_text('{"forwardPorts": [8000]}')
+
+        manager = SandboxManager(devcontainer_file=devcontainer)
+        manager._docker = MagicMock()
+        manager._docker.list_sandbox_container_info.return_value = []
+        manager._git = MagicMock()
+
+        reported = threading.Event()
+        release = threading.Event()
+
+        def prepare_image(*args, on_progress=None, **kwargs):
+            on_progress("Building container image...")
+            reported.set()
+            assert release.wait(timeout=5)
+            return "built-image"
+
+        def create_sandbox(name, branch):
+            # Make sure the build has reported its step before git finishes
+            assert reported.wait(timeout=5)
+            return tmp_path / ".sandboxes" / name
+
+        steps = []
+
+        def on_progress(step):
+            steps.append((step, threading.current_thread()))
+            if step == "Building container image...":
+                release.set()
+
+        manager._docker.prepare_image.side_effect = prepare_image
+        manager._git.create_sandbox.side_effect = create_sandbox
+
+        manager.start("alice", on_progress=on_progress, state=ContainerState.NOT_FOUND)
+
+        assert [step for step, _ in steps] == [
+            "Checking for existing sandbox...",
+            "Setting up git server...",
+            "Creating sandbox clone...",
+            "Building container image...",
+        ]
+        assert all(thread is threading.current_thread() for _, thread in steps)
+
+    def test_start_stopped_container_skips_image(self, tmp_path):
+        """Should not prepare an image when the container already exists."""
+        devcontainer = tmp_path / ".devcontainer.json"
+        devcontainer.write_text('{"forwardPorts": [8000]}')
+
+        manager = SandboxManager(devcontainer_file=devcontainer)
+        manager._docker = MagicMock()
+        manager._docker.list_sandbox_container_info.return_value = []
+        manager._git = MagicMock()
+
+        manager.start("alice", state=ContainerState.STOPPED)
+
+        manager._docker.prepare_image.assert_not_called()
+        kwargs = manager._docker.start_container.call_args.kwargs
+        assert kwargs["run_image"] is None
+
 
 class TestSandboxManagerStop:
     """Tests for stop method."""
@@ -274,6 +434,39 @@ class TestSandboxManagerStop:
 
         manager._docker.stop_container.assert_called_once_with("alice")
 
+    def test_stop_all_stops_listed_containers(self, tmp_path):
+        """Should stop every listed container and return sandbox names."""
+        devcontainer = tmp_path / ".devcontainer.json"
+        devcontainer.write_text("{}")
+
+        manager = SandboxManager(devcontainer_file=devcontainer)
+        manager._docker = MagicMock()
+        manager._docker.list_sandbox_container_info.return_value = [
+            SandboxContainer("c-a", "a", {}),
+            SandboxContainer("c-b", "b", {}),
+        ]
+        manager._docker.stop_containers.return_value = iter(["c-b", "c-a"])
+
+        result = manager.stop_all(all_namespaces=True)
+
+        assert result == ["b", "a"]
+        manager._docker.list_sandbox_container_info.assert_called_once_with(
+            all_namespaces=True
+        )
+        manager._docker.stop_containers.assert_called_once_with(["c-a", "c-b"])
+
+    def test_stop_all_without_containers(self, tmp_path):
+        """Should not run docker stop when nothing is running."""
+        devcontainer = tmp_path / ".devcontainer.json"
+        devcontainer.write_text("{}")
+
+        manager = SandboxManager(devcontainer_file=devcontainer)
+        manager._docker = MagicMock()
+        manager._docker.list_sandbox_container_info.return_value = []
+
+        assert manager.stop_all() == []
+        manager._docker.stop_containers.assert_not_called()
+
 
 class TestSandboxManagerRemove:
     """Tests for remove method."""
@@ -309,7 +502,7 @@ class TestSandboxManagerRemove:
 
         manager.remove("alice")
 
-        manager._docker.stop_container.assert_called_once_with("alice")
+        manager._docker.stop_container.assert_not_called()
         manager._docker.remove_container.assert_called_once_with("alice")
         manager._git.remove_sandbox.assert_called_once_with("alice")
 
@@ -348,9 +541,9 @@ class TestSandboxManagerList:
 
         manager = SandboxManager(tmp_path)
         manager._docker = MagicMock()
-        manager._docker.list_sandbox_containers.return_value = ["sandbox-alice"]
-        manager._docker.get_sandbox_name_from_container.return_value = "alice"
-        manager._docker.get_container_ports.return_value = {8000: 8001}
+        manager._docker.list_sandbox_container_info.return_value = [
+            SandboxContainer("sandbox-alice", "alice", {8000: 8001})
+        ]
         manager._git = MagicMock()
         manager._git.get_current_branch.return_value = "sandbox/alice"
         manager._git.sandbox_path.return_value = sandbox_path
@@ -399,9 +592,9 @@ class TestSandboxManagerList:
 
         manager = SandboxManager(tmp_path)
         manager._docker = MagicMock()
-        manager._docker.list_sandbox_containers.return_value = ["sandbox-orphaned"]
-        manager._docker.get_sandbox_name_from_container.return_value = "orphaned"
-        manager._docker.get_container_ports.return_value = {8000: 8001}
+        manager._docker.list_sandbox_container_info.return_value = [
+            SandboxContainer("sandbox-orphaned", "orphaned", {8000: 8001})
+        ]
         manager._git = MagicMock()
         manager._git.sandbox_path.return_value = sandbox_path
         # get_current_branch should NOT be called for orphaned sandboxes
@@ -450,14 +643,10 @@ class TestSandboxManagerList:
 
         manager = SandboxManager(tmp_path)
         manager._docker = MagicMock()
-        manager._docker.list_sandbox_containers.return_value = [
-            "sandbox-valid",
-            "sandbox-orphaned",
+        manager._docker.list_sandbox_container_info.return_value = [
+            SandboxContainer("sandbox-valid", "valid", {8000: 8001}),
+            SandboxContainer("sandbox-orphaned", "orphaned", {8000: 8001}),
         ]
-        manager._docker.get_sandbox_name_from_container.side_effect = lambda c: (
-            "valid" if "valid" in c else "orphaned"
-        )
-        manager._docker.get_container_ports.return_value = {8000: 8001}
         manager._git = MagicMock()
         manager._git.sandbox_path.side_effect = lambda name: (
             valid_sandbox_path if name == "valid" else orphaned_sandbox_path
@@ -478,6 +667,34 @@ class TestSandboxManagerList:
         # get_current_branch should only be called for valid sandbox
         manager._git.get_current_branch.assert_called_once_with("valid")
 
+    def test_list_keeps_container_order(self, tmp_path):
+        """Should return sandboxes in docker ps order when querying concurrently."""
+        devcontainer_dir = tmp_path / ".devcontainer"
+        devcontainer_dir.mkdir()
+        (devcontainer_dir / "devcontainer.json").write_text(
+            '{"build": {"dockerfile": "Dockerfile"}}'
+        )
+
+        names = [f"sandbox{i}" for i in range(20)]
+        for name in names:
+            (tmp_path / ".sandboxes" / name).mkdir(parents=True)
+
+        manager = SandboxManager(tmp_path)
+        manager._docker = MagicMock()
+        manager._docker.list_sandbox_container_info.return_value = [
+            SandboxContainer(f"sandbox-{name}", name, {}) for name in names
+        ]
+        manager._git = MagicMock()
+        manager._git.sandbox_path.side_effect = lambda name: (
+            tmp_path / ".sandboxes" / name
+        )
+        manager._git.get_current_branch.side_effect = lambda name: f"sandbox/{name}"
+
+        result = manager.list()
+
+        assert [s.name for s in result] == names
+        assert [s.branch for s in result] == [f"sandbox/{name}" for name in names]
+
 
 class TestSandboxInfo:
     """Tests for SandboxInfo dataclass."""
@@ -495,3 +712,14 @@ class TestSandboxInfo:
         assert info.branch == "sandbox/alice"
         assert info.ports == {8000: 8001, 5173: 5174}
         assert info.sandbox_path == Path("/tmp/.sandboxes/alice")
+
+    def test_sandbox_info_formats_ports(self):
+        """Should precompute a sorted container:host ports string."""
+        info = SandboxInfo(
+            name="alice",
+            branch="sandbox/alice",
+            ports={8000: 8001, 5173: 5174},
+            sandbox_path=Path("/tmp/.sandboxes/alice"),
+        )
+
+        assert info.ports_str == "5173:5174, 8000:8001"
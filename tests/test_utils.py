@@ -5,6 +5,7 @@ from pathlib import Path
 
 
 from agent_sandbox.utils import (
+    clear_project_root_cache,
     find_project_root,
     find_devcontainer_json,
     parse_devcontainer_json,
@@ -62,6 +63,16 @@ class TestFindProjectRoot:
         result = find_project_root(Path("/nonexistent/deep/path"))
         assert result is None
 
+    def test_memoizes_result_until_cleared(self, tmp_path):
+        """Should reuse the first result until the cache is cleared."""
+        assert find_project_root(tmp_path) is None
+
+        (tmp_path / ".devcontainer.json").write_text("{}")
+        assert find_project_root(tmp_path) is None
+
+        clear_project_root_cache()
+        assert find_project_root(tmp_path) == tmp_path
+
 
 class TestFindDevcontainerJson:
     """Tests for find_devcontainer_json function."""
@@ -134,6 +145,17 @@ class TestParseDevcontainerJson:
         result = parse_devcontainer_json(devcontainer)
         assert result == {}
 
+    def test_parses_file_once(self, tmp_path, mocker):
+        """Should reuse the parsed result while the file is unchanged."""
+        devcontainer = tmp_path / "devcontainer.json"
+        devcontainer.write_text('{"name": "test"}')
+        spy = mocker.spy(json, "loads")
+
+        parse_devcontainer_json(devcontainer)
+        parse_devcontainer_json(devcontainer)
+
+        assert spy.call_count == 1
+
 
 class TestParseDevcontainerPorts:
     """Tests for parse_devcontainer_ports function."""